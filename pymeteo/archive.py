@@ -0,0 +1,274 @@
+"""
+.. module:: pymeteo.archive
+   :platform: Unix, Windows
+   :synopsis: Columnar HDF5 archive of soundings
+
+This module stores many soundings in one HDF5 file.  The levels of all
+soundings are concatenated into one array per field and an offset index
+gives the levels of each sounding, so soundings of any depth are stored
+without padding.  Per-sounding metadata (station, latitude, longitude
+and time) are kept in parallel arrays.
+
+The file layout is
+
+   * /levels/z, /levels/th, /levels/p, /levels/qv, /levels/u, /levels/v --
+     (nlevel,) concatenated levels in m, K, Pa, kg/kg and m/s
+   * /offsets -- (nsounding+1,) first level of each sounding, the last
+     entry is the total number of levels
+   * /station -- (nsounding,) station names
+   * /lat, /lon -- (nsounding,) location (degrees)
+   * /time -- (nsounding,) observation time (s since 1970-01-01 UTC)
+
+Writing
++++++++
+
+.. code-block:: python
+
+   from pymeteo import archive
+
+   with archive.Writer('soundings.h5') as w:
+       for ...:
+           w.append(z, th, p, qv, u, v, station='72210', lat=27.7, lon=-82.4, time=t)
+
+Reading
++++++++
+
+.. code-block:: python
+
+   a = archive.Archive('soundings.h5')
+   s = a[1234]                        # one sounding as a dict of arrays
+   levels, offsets = a.load()         # all levels, one read per field
+   th = a.padded('th')                # (nsounding, max levels) array
+
+Module Reference
+++++++++++++++++
+"""
+
+import numpy as np
+import h5py
+
+fields = ('z', 'th', 'p', 'qv', 'u', 'v')
+"""Level fields of each sounding"""
+
+default_chunk = 2**16
+"""HDF5 chunk size (levels or soundings)"""
+
+sparse_ratio = 4
+"""Selections whose level span is larger than this many times the number
+of selected levels are read run by run instead of in one read"""
+
+#-------------------------------------------------------
+# Writing
+
+class Writer(object):
+    """Appends soundings to an archive
+
+    :param filename: archive file, created if it does not exist
+    :param mode: 'a' to append to an existing archive, 'w' to overwrite
+    :param buffer: number of soundings held in memory between writes
+    """
+
+    def __init__(self, filename, mode='a', buffer=1024):
+        self.file = h5py.File(filename, mode)
+        self.buffer = buffer
+        self._pending = []
+        if 'offsets' not in self.file:
+            for name in fields:
+                self.file.create_dataset('levels/' + name, (0,), np.float32,
+                                         maxshape=(None,), chunks=(default_chunk,))
+            self.file.create_dataset('offsets', data=np.zeros(1, np.int64),
+                                     maxshape=(None,), chunks=(default_chunk,))
+            self.file.create_dataset('station', (0,), h5py.string_dtype(),
+                                     maxshape=(None,), chunks=(default_chunk,))
+            for name in ('lat', 'lon', 'time'):
+                self.file.create_dataset(name, (0,), np.float64,
+                                         maxshape=(None,), chunks=(default_chunk,))
+
+    def append(self, z, th, p, qv, u, v, station='', lat=np.nan, lon=np.nan, time=np.nan):
+        """Adds one sounding
+
+        :param z, th, p, qv, u, v: profiles (m, K, Pa, kg/kg, m/s, m/s)
+        :param station: station name or identifier
+        :param lat, lon: location (degrees)
+        :param time: observation time (s since 1970-01-01 UTC)
+        """
+        self._pending.append(([np.asarray(a, np.float32).ravel() for a in (z, th, p, qv, u, v)],
+                              (str(station), lat, lon, time)))
+        if len(self._pending) >= self.buffer:
+            self.flush()
+
+    def flush(self):
+        """Writes the buffered soundings"""
+        if not self._pending:
+            return
+        f = self.file
+        nlevels = np.array([len(levels[0]) for levels, meta in self._pending], np.int64)
+        nlevel = f['offsets'][-1]
+        for n, name in enumerate(fields):
+            _extend(f['levels/' + name], np.concatenate([levels[n] for levels, meta in self._pending]))
+        _extend(f['offsets'], nlevel + np.cumsum(nlevels))
+        meta = list(zip(*[meta for levels, meta in self._pending]))
+        _extend(f['station'], np.array(meta[0], dtype=object))
+        for name, values in zip(('lat', 'lon', 'time'), meta[1:]):
+            _extend(f[name], np.array(values, np.float64))
+        self._pending = []
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+def _extend(dset, values):
+    n = dset.shape[0]
+    dset.resize((n + len(values),))
+    dset[n:] = values
+
+def write(filename, soundings, stations=None, lat=None, lon=None, time=None):
+    """Writes a list of soundings to a new archive
+
+    :param soundings: list of (z, th, p, qv, u, v) tuples
+    :param stations, lat, lon, time: optional per-sounding metadata lists
+    """
+    n = len(soundings)
+    stations = [''] * n if stations is None else stations
+    lat = [np.nan] * n if lat is None else lat
+    lon = [np.nan] * n if lon is None else lon
+    time = [np.nan] * n if time is None else time
+    with Writer(filename, 'w', buffer=max(n, 1)) as w:
+        for sounding, s, la, lo, t in zip(soundings, stations, lat, lon, time):
+            w.append(*sounding, station=s, lat=la, lon=lo, time=t)
+
+#-------------------------------------------------------
+# Reading
+
+class Archive(object):
+    """Reads soundings from an archive
+
+    :param filename: archive file
+
+    The offset index is read when the archive is opened; levels are only
+    read when requested.
+    """
+
+    def __init__(self, filename):
+        self.file = h5py.File(filename, 'r')
+        self.offsets = self.file['offsets'][:]
+        self._meta = {}
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def metadata(self, name):
+        """Per-sounding metadata array: station, lat, lon or time"""
+        if name not in self._meta:
+            if name == 'station':
+                self._meta[name] = self.file['station'].asstr()[:]
+            else:
+                self._meta[name] = self.file[name][:]
+        return self._meta[name]
+
+    def nlevels(self, indices=None):
+        """Number of levels of each sounding"""
+        n = np.diff(self.offsets)
+        return n if indices is None else n[indices]
+
+    def __getitem__(self, n):
+        """One sounding as a dict of level arrays and metadata"""
+        if n < 0:
+            n += len(self)
+        b, e = self.offsets[n], self.offsets[n+1]
+        sounding = dict((name, self.file['levels/' + name][b:e]) for name in fields)
+        sounding['station'] = self.file['station'].asstr()[n]
+        for name in ('lat', 'lon', 'time'):
+            sounding[name] = float(self.file[name][n])
+        return sounding
+
+    def load(self, indices=None, fields=fields):
+        """Reads the levels of many soundings
+
+        :param indices: soundings to read, defaults to all
+        :param fields: level fields to read
+        :returns: dict of concatenated level arrays and the offsets of
+                  the soundings in them
+
+        Each field is read with one contiguous read spanning the selected
+        soundings, then the selected levels are gathered in memory.  When
+        the span is more than :py:data:`sparse_ratio` times the selected
+        levels, the runs of adjacent selected soundings are read one by
+        one instead.
+        """
+        if indices is None:
+            return dict((name, self.file['levels/' + name][:]) for name in fields), self.offsets.copy()
+
+        indices = np.atleast_1d(np.asarray(indices, np.int64))
+        begin = self.offsets[indices]
+        nlevels = self.offsets[indices+1] - begin
+        offsets = np.zeros(len(indices)+1, np.int64)
+        np.cumsum(nlevels, out=offsets[1:])
+        if offsets[-1] == 0:
+            return dict((name, np.empty(0, np.float32)) for name in fields), offsets
+
+        # level index of every selected level, without a loop over soundings
+        take = np.arange(offsets[-1]) - np.repeat(offsets[:-1] - begin, nlevels)
+        lo, hi = take.min(), take.max() + 1
+        if hi - lo <= sparse_ratio * offsets[-1]:
+            take -= lo
+            return dict((name, self.file['levels/' + name][lo:hi][take]) for name in fields), offsets
+
+        # merge the selected soundings into runs of adjacent levels
+        order = np.argsort(begin[nlevels > 0], kind='stable')
+        b = begin[nlevels > 0][order]
+        e = b + nlevels[nlevels > 0][order]
+        first = np.flatnonzero(np.r_[True, b[1:] > np.maximum.accumulate(e)[:-1]])
+        run_begin = b[first]
+        run_end = np.maximum.reduceat(e, first)
+        run_offset = np.r_[0, np.cumsum(run_end - run_begin)[:-1]]
+        run = np.searchsorted(run_begin, take, 'right') - 1
+        take = take - run_begin[run] + run_offset[run]
+        return dict((name, np.concatenate([self.file['levels/' + name][rb:re]
+                                           for rb, re in zip(run_begin, run_end)])[take])
+                    for name in fields), offsets
+
+    def padded(self, name, indices=None, fill=np.nan):
+        """Reads one field as a (nsounding, max levels) array
+
+        :param name: level field
+        :param indices: soundings to read, defaults to all
+        :param fill: value for levels past the top of a sounding
+        """
+        levels, offsets = self.load(indices, (name,))
+        nlevels = np.diff(offsets)
+        out = np.full((len(nlevels), nlevels.max() if len(nlevels) else 0), fill, np.float32)
+        row = np.repeat(np.arange(len(nlevels)), nlevels)
+        col = np.arange(offsets[-1]) - np.repeat(offsets[:-1], nlevels)
+        out[row, col] = levels[name]
+        return out
+
+    def select(self, station=None, time=None, lat=None, lon=None):
+        """Indices of the soundings matching all of the given criteria
+
+        :param station: station name
+        :param time, lat, lon: (min, max) ranges
+        """
+        mask = np.ones(len(self), bool)
+        if station is not None:
+            mask &= self.metadata('station') == str(station)
+        for name, bounds in (('time', time), ('lat', lat), ('lon', lon)):
+            if bounds is not None:
+                values = self.metadata(name)
+                mask &= (values >= bounds[0]) & (values <= bounds[1])
+        return np.flatnonzero(mask)
@@ -11,6 +11,48 @@ import pymeteo.cm1.PlotWidget as PW
 import pymeteo.cm1.StatWidget as SW
 
 
+class WorkerSignals(QtCore.QObject):
+
+   # generation, results
+   done = pyqtSignal(int, object)
+   failed = pyqtSignal(int, str)
+
+
+class Worker(QtCore.QRunnable):
+   """Generates a sounding and hodograph and computes everything the
+   plots and statistics need, away from the GUI thread.  Drawing stays
+   on the GUI thread, which receives the results through signals."""
+
+   def __init__(self, generation, current, sounding, sounding_options, hodograph, hodograph_options):
+      super(Worker,self).__init__()
+      self.generation = generation
+      self.current = current
+      self.sounding = (sounding, sounding_options)
+      self.hodograph = (hodograph, hodograph_options)
+      self.signals = WorkerSignals()
+
+   def superseded(self):
+      return self.current() != self.generation
+
+   def run(self):
+      try:
+         generator, options = self.sounding
+         z,th,p,qv = generator(**options)
+         generator, options = self.hodograph
+         z2,u,v = generator(**options)
+         if self.superseded():
+            return
+         profiles = skewt.calc_sounding_profiles(z,th,p,qv)
+         if self.superseded():
+            return
+         sstats = skewt.calc_sounding_stats(z,th,p,qv,profiles['pcl'])
+         hstats = skewt.calc_hodograph_stats(z,u,v)
+      except Exception as e:
+         self.signals.failed.emit(self.generation, str(e))
+         return
+      self.signals.done.emit(self.generation, (z,th,p,qv,z2,u,v,profiles,sstats,hstats))
+
+
 class MainWindow(QtWidgets.QWidget):
 
    def __init__(self):
@@ -70,7 +112,11 @@ class MainWindow(QtWidgets.QWidget):
              instance = cobj()
              self.WindTabs.addTab(instance, name)
 
-      self.Sounding.SStats.connect(self.SoundingInfo.SStat_values)
+      # plots and statistics are computed by one worker at a time; a
+      # newer request supersedes queued and running ones
+      self.pool = QtCore.QThreadPool(self)
+      self.pool.setMaxThreadCount(1)
+      self.generation = 0
 
       self.pushButton.clicked.connect(self.export)
       self.exportSounding.connect(self.SoundingInfo.output_sounding)
@@ -113,11 +159,30 @@ class MainWindow(QtWidgets.QWidget):
      self.exportSounding.emit(self.lineEdit.text())
 
    def update_plot(self):
-     self.drawButton.setEnabled(False)
-     z,th,p,qv = self.SoundingTabs.currentWidget().plot()
-     z2,u,v = self.WindTabs.currentWidget().plot()
-     self.Sounding.plot_sounding(z,th,p,qv,u,v)
+     self.generation += 1
+     self.pool.clear()
+     sounding = self.SoundingTabs.currentWidget()
+     hodograph = self.WindTabs.currentWidget()
+     worker = Worker(self.generation, lambda: self.generation,
+                     sounding.generator, sounding.getOptions(),
+                     hodograph.generator, hodograph.getOptions())
+     worker.signals.done.connect(self.show_results)
+     worker.signals.failed.connect(self.show_error)
+     self.pool.start(worker)
+
+   @pyqtSlot(int, object)
+   def show_results(self, generation, results):
+     if generation != self.generation:
+       return
+     z,th,p,qv,z2,u,v,profiles,sstats,hstats = results
+     self.Sounding.plot_sounding(z,th,p,qv,u,v,profiles)
      self.Hodograph.plot_hodograph(z2,u,v)
+     self.SoundingInfo.setStats(z,th,p,qv,u,v,sstats,hstats)
+
+   @pyqtSlot(int, str)
+   def show_error(self, generation, message):
+     if generation == self.generation:
+       self.SoundingInfo.statsBox.setText("Error: {0}".format(message))
 
    @pyqtSlot()
    def enableButton(self):
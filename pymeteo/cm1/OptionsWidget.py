@@ -1,4 +1,5 @@
 from PyQt5 import QtWidgets, QtGui, QtCore
+from pymeteo.cm1 import profiles
 
 class OptionsWidget(QtWidgets.QFrame):
 
@@ -33,3 +34,15 @@ class OptionsWidget(QtWidgets.QFrame):
   def getOption(self, name):
     return float(self.variables[name].text())
 
+  def initGenerator(self, generator):
+    # builds the options from a pymeteo.cm1.profiles generator
+    self.generator = generator
+    defaults = profiles.defaults(generator)
+    self.initUI(generator.title, [(label, '{0:g}'.format(defaults[arg]), units)
+                                  for label, arg, units in generator.options])
+
+  def getOptions(self):
+    return dict((arg, self.getOption(label)) for label, arg, units in self.generator.options)
+
+  def plot(self):
+    return self.generator(**self.getOptions())
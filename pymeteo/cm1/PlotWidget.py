@@ -1,5 +1,4 @@
 from PyQt5 import QtWidgets, QtGui, QtCore
-from PyQt5.QtCore import pyqtSignal
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as \
     FigureCanvas
 from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as \
@@ -15,9 +14,6 @@ from pymeteo import skewt
 
 class PlotWidget(QtWidgets.QFrame):
 
-    SStats = pyqtSignal(np.ndarray, np.ndarray, np.ndarray, np.ndarray,
-                        np.ndarray, np.ndarray)
-
     def __init__(self, parent=None):
         super(PlotWidget, self).__init__(parent)
         self.initUI()
@@ -27,6 +23,12 @@ class PlotWidget(QtWidgets.QFrame):
         self.canvas = FigureCanvas(self.figure)
         self.toolbar = NavigationToolbar(self.canvas, self)
 
+        self.ax = None
+        self.background = set()
+        self.animated = []
+        self.bitmap = None
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+
         layout = QtWidgets.QVBoxLayout()
         layout.addWidget(self.toolbar)
         layout.addWidget(self.canvas)
@@ -34,34 +36,57 @@ class PlotWidget(QtWidgets.QFrame):
 
     def plot_sounding_axes(self):
         self.figure.clear()
-        ax = self.figure.add_axes([0.05, 0.05, 0.90, 0.945])
+        self.ax = self.figure.add_axes([0.05, 0.05, 0.90, 0.945])
         # ax = self.figure.add_axes([0.005,0.05,0.985,0.945])
-        ax.hold(True)
         skewt.set_fontscalefactor(4)
-        skewt.plot_sounding_axes(ax)
-        self.canvas.draw()
+        skewt.plot_sounding_axes(self.ax)
+        self._keep_background()
 
     def plot_hodograph_axes(self):
-        ax = self.figure.add_axes([0.005, 0.005, 0.985, 0.985])
-        ax.hold(True)
-        skewt.plot_hodo_axes(ax)
-        self.canvas.draw()
-
-    def plot_sounding(self, z, th, p, qv, u, v):
         self.figure.clear()
-        # ax = self.figure.add_axes([0.005,0.05,0.985,0.945])
-        ax = self.figure.add_axes([0.05, 0.05, 0.90, 0.945])
-        ax.hold(True)
-        skewt.plot_sounding_axes(ax)
-        skewt.plot_sounding(ax, z, th, p, qv, u, v)
-        self.canvas.draw()
-        # Send data to stats widget
-        self.SStats.emit(z, th, p, qv, u, v)
+        self.ax = self.figure.add_axes([0.005, 0.05, 0.985, 0.945])
+        skewt.plot_hodo_axes(self.ax)
+        self._keep_background()
+
+    def plot_sounding(self, z, th, p, qv, u, v, profiles=None):
+        if self.ax is None:
+            self.plot_sounding_axes()
+        self._replace_profiles(
+            lambda ax: skewt.plot_sounding(ax, z, th, p, qv, u, v, profiles))
 
     def plot_hodograph(self, z, u, v):
-        self.figure.clear()
-        ax = self.figure.add_axes([0.005, 0.05, 0.985, 0.945])
-        ax.hold(True)
-        skewt.plot_hodo_axes(ax)
-        skewt.plot_hodograph(ax, z, u, v)
+        if self.ax is None:
+            self.plot_hodograph_axes()
+        self._replace_profiles(lambda ax: skewt.plot_hodograph(ax, z, u, v))
+
+    # The background lines are drawn once and kept as a bitmap.  The
+    # profile artists are animated: they are left out of full redraws
+    # and drawn over the saved bitmap (blitted) whenever they change.
+
+    def _keep_background(self):
+        self.background = skewt.background_artists([self.ax])
+        self.animated = []
+        self.bitmap = None
         self.canvas.draw()
+
+    def _on_draw(self, event):
+        # full redraw (first show, resize, zoom): save the new background
+        self.bitmap = self.canvas.copy_from_bbox(self.figure.bbox)
+        self._draw_animated()
+
+    def _draw_animated(self):
+        for artist in self.animated:
+            self.figure.draw_artist(artist)
+
+    def _replace_profiles(self, draw):
+        skewt.remove_artists([self.ax], self.background)
+        draw(self.ax)
+        self.animated = [a for a in self.ax.get_children() if a not in self.background]
+        for artist in self.animated:
+            artist.set_animated(True)
+        if self.bitmap is None:
+            self.canvas.draw()
+        else:
+            self.canvas.restore_region(self.bitmap)
+            self._draw_animated()
+            self.canvas.blit(self.figure.bbox)
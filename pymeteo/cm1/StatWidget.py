@@ -5,6 +5,7 @@ import numpy as np
 
 from pymeteo import skewt
 from pymeteo import dynamics
+from pymeteo.cm1 import ensemble
 
 # widgets -> skewt wind sounding etc
 
@@ -23,6 +24,7 @@ class StatWidget(QtWidgets.QFrame):
     self.qv = 0
     self.SStats = 0
     self.HStats = 0
+    self.stats = None
 
   def initUI(self):
     self.statsBox = QtWidgets.QTextBrowser(self)
@@ -39,7 +41,7 @@ class StatWidget(QtWidgets.QFrame):
     if (self.SStats == 0):
       self.statsBox.append("No Sounding Plotted")  
     else:
-      pcl, mupcl, mlpcl = skewt.calc_sounding_stats(self.z, self.th, self.p, self.qv)
+      (pcl, mupcl, mlpcl), shear = self.stats
       self.statsBox.append("Var\t\tSFC\tML\tMU")
       self.statsBox.append("CAPE\tJ/kg\t{0:.0f}\t{1:.0f}\t{2:.0f}".format(pcl['cape'],mlpcl['cape'],mupcl['cape']))
       self.statsBox.append("CIN\tJ/kg\t{0:.1f}\t{1:.1f}\t{2:.1f}".format(pcl['cin'],mlpcl['cin'],mupcl['cin']))
@@ -53,7 +55,6 @@ class StatWidget(QtWidgets.QFrame):
 
       self.statsBox.append("PRS\tmb\t{0:.0f}\t{1:.0f}\t{2:.0f}".format(pcl['prs']/100.,mlpcl['prs']/100.,mupcl['prs']/100.))
       self.statsBox.append("")
-      shear = skewt.calc_hodograph_stats(self.z, self.u, self.v)
       cth,cr = dynamics.uv_to_deg(shear['bunkers'][0],shear['bunkers'][1])
       self.statsBox.append("Storm motion (left mover): {0:.0f} deg {1:5.2f} m/s".format(cth,cr))
       self.statsBox.append("Storm motion (left mover): u={0:5.2f} v={1:5.2f} m/s".format(shear['bunkers'][0],shear['bunkers'][1]))
@@ -69,8 +70,9 @@ class StatWidget(QtWidgets.QFrame):
 
       self.statsdone.emit()
 
-  @pyqtSlot(np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray)
-  def SStat_values(self, z,th,p,qv,u,v):
+  def setStats(self, z, th, p, qv, u, v, sstats, hstats):
+    # shows statistics already computed by calc_sounding_stats and
+    # calc_hodograph_stats
     self.z = z
     self.th = th
     self.p = p
@@ -78,15 +80,10 @@ class StatWidget(QtWidgets.QFrame):
     self.u = u
     self.v = v
     self.SStats = 1
+    self.stats = (sstats, hstats)
     self.calcStats()
 
   @pyqtSlot(str)
   def output_sounding(self, filename):
     print("would output to file {0}".format(filename))
-    f = open(filename, 'w')
-    for k in range(len(self.z)):
-      if (k==0):
-        print("{0:8.2f}\t{1:8.6f}\t{2:8.6f}".format(self.p[0]/100., self.th[0], self.qv[0]*1000.), file=f)
-      else:
-        print("{0:8.2f}\t{1:8.6f}\t{2:8.6f}\t{3:8.6f}\t{4:8.6f}".format(self.z[k], self.th[k], self.qv[k]*1000., self.u[k], self.v[k]), file=f)
-    f.close() 
+    ensemble.write_input_sounding(filename, self.z, self.th, self.p, self.qv, self.u, self.v)
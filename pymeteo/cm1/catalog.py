@@ -0,0 +1,167 @@
+"""Catalog of the files of a CM1 HDF5 dataset
+
+The catalog lists the ``<dataset>.NNNNN.h5`` files in the output
+directory and records, for each file, the model time read from ``/time``,
+the grid size and the shape of every variable.  The index is kept in
+``<dataset>.catalog.json`` next to the output.  Refreshing the catalog
+only opens files that are new or have changed since the last refresh,
+so following a running simulation costs one directory listing plus the
+new files.
+
+.. code-block:: python
+
+   from pymeteo.cm1 import catalog
+
+   cat = catalog.Catalog('/data/run', 'cm1out')
+   cat.times                # model times (s)
+   cat.filename(3600.)      # file holding t=3600 s
+   cat.refresh()            # pick up files written since
+
+"""
+
+import os
+import re
+import json
+import numpy as np
+import h5py
+
+version = 1
+"""Catalog file format version"""
+
+#-------------------------------------------------------
+
+def scan(filename):
+   """Reads the catalog entry of one CM1 HDF5 file
+
+   :param filename: the HDF5 file
+   :returns: dict with time, nx, ny, nz and variables (name -> shape)
+   """
+   with h5py.File(filename, 'r') as datafile:
+      variables = {}
+      def visit(name, obj):
+         if isinstance(obj, h5py.Dataset):
+            variables['/' + name] = list(obj.shape)
+      datafile.visititems(visit)
+      return { 'time'      : float(np.ravel(datafile['/time'][()])[0]),
+               'nx'        : int(datafile['/grid/nx'][()]),
+               'ny'        : int(datafile['/grid/ny'][()]),
+               'nz'        : int(datafile['/grid/nz'][()]),
+               'variables' : variables }
+
+#-------------------------------------------------------
+
+class Catalog(object):
+   """Index of the output files of a CM1 HDF5 dataset
+
+   :param path: path to CM1 data files
+   :param datasetname: the CM1 data files basename
+   :param refresh: scan the directory for new files when opening
+   """
+
+   def __init__(self, path, datasetname, refresh=True):
+      self.path = path
+      self.dsetname = datasetname
+      self.index_filename = os.path.join(path, datasetname + '.catalog.json')
+      self.pattern = re.compile(r'^{0}\.(\d+)\.h5$'.format(re.escape(datasetname)))
+      self.entries = {}
+      try:
+         with open(self.index_filename, 'r') as index_file:
+            index = json.load(index_file)
+         if index.get('version') == version:
+            self.entries = index['files']
+      except (IOError, OSError, ValueError):
+         pass
+      if refresh:
+         self.refresh()
+
+   def refresh(self):
+      """Adds new or changed files to the catalog and drops removed ones
+
+      :returns: True if the catalog changed
+      """
+      found = {}
+      for entry in os.scandir(self.path):
+         match = self.pattern.match(entry.name)
+         if match:
+            stat = entry.stat()
+            found[entry.name] = (int(match.group(1)), [stat.st_mtime, stat.st_size])
+
+      scanned = []
+      for name, (number, key) in sorted(found.items()):
+         cached = self.entries.get(name)
+         if cached is not None and cached['key'] == key:
+            continue
+         try:
+            entry = scan(os.path.join(self.path, name))
+         except (IOError, OSError, KeyError):
+            # a file still being written by the model
+            continue
+         entry['number'] = number
+         entry['key'] = key
+         self.entries[name] = entry
+         scanned.append(name)
+
+      removed = [name for name in self.entries if name not in found]
+      for name in removed:
+         del self.entries[name]
+
+      if scanned or removed:
+         print('  Cataloged {0} new and {1} removed files, {2} files in {3}'.format(len(scanned), len(removed), len(self.entries), self.index_filename))
+         self.save()
+      return bool(scanned or removed)
+
+   def save(self):
+      """Writes the index, ignoring unwritable dataset directories
+
+      The index is written to a temporary file that then replaces it, so
+      readers never see a partly written index.
+      """
+      tmp_filename = '{0}.tmp.{1}'.format(self.index_filename, os.getpid())
+      try:
+         with open(tmp_filename, 'w') as index_file:
+            json.dump({'version': version, 'files': self.entries}, index_file)
+         os.replace(tmp_filename, self.index_filename)
+      except (IOError, OSError):
+         try:
+            os.remove(tmp_filename)
+         except OSError:
+            pass
+
+   def __len__(self):
+      return len(self.entries)
+
+   def _sorted(self):
+      return sorted(self.entries.items(), key=lambda item: (item[1]['time'], item[1]['number']))
+
+   @property
+   def files(self):
+      """Basenames of the files in time order"""
+      return [name for name, entry in self._sorted()]
+
+   @property
+   def numbers(self):
+      """File numbers in time order"""
+      return np.array([entry['number'] for name, entry in self._sorted()], dtype=int)
+
+   @property
+   def times(self):
+      """Model times (s) of the files in time order"""
+      return np.array([entry['time'] for name, entry in self._sorted()])
+
+   def entry(self, number):
+      """Catalog entry of a file number"""
+      for entry in self.entries.values():
+         if entry['number'] == int(number):
+            return entry
+      raise ValueError('File number {0} is not in {1}'.format(number, self.index_filename))
+
+   def filename(self, time, tolerance=1e-3):
+      """Path of the file holding a model time
+
+      :param time: model time (s)
+      :param tolerance: largest difference from the file time (s)
+      """
+      for name, entry in self.entries.items():
+         if abs(entry['time'] - time) <= tolerance:
+            return os.path.join(self.path, name)
+      raise ValueError('No file at time {0} s in {1}'.format(time, self.index_filename))
@@ -0,0 +1,106 @@
+"""Circulation budgets of material circuits in CM1 HDF5 output
+
+Circuit point positions come from a trajectory file with the layout
+
+   * /time -- (nt,) model times (s)
+   * /x, /y, /z -- (nt, npoints) point positions (km)
+
+where the points of each circuit are consecutive and ordered
+clockwise.  At each time the bounding box of all points is read from
+the model output, the winds and potential temperature are
+interpolated to the points and the circulation and baroclinic
+generation (integral of B dz) of every circuit are evaluated.  The
+time integral of the generation is accumulated as the times are
+walked so that it can be compared to the change in circulation.
+
+.. code-block:: python
+
+   from pymeteo.cm1 import read_hdf5, circuits
+
+   cm1 = read_hdf5.CM1('/data/run', 'cm1out')
+   budget = circuits.integrate(cm1, 'circuits.h5', npoint=200)
+   # budget['C'][-1] - budget['C'][0] ~ budget['intBdzdt'][-1]
+
+"""
+
+import numpy as np
+import h5py
+from pymeteo.constants import missingval
+import pymeteo.dynamics as dyn
+import pymeteo.interp
+from pymeteo.cm1 import trajectories
+
+#-------------------------------------------------------
+
+def evaluate(cm1, time, x, y, z):
+   """Evaluates the circulation budget of circuits at one time
+
+   :param cm1: :py:class:`pymeteo.cm1.read_hdf5.CM1` dataset
+   :param time: the timelevel (file number) to read
+   :param x, y, z: (ncircuit, npoint) circuit positions (km)
+   :returns: circulation (m2/s) and integral of B dz (m2/s2), (ncircuit,)
+
+   Winds are interpolated from their staggered grids and only the
+   bounding box of the circuits is read.  As for trajectories, points
+   below the lowest or above the highest level of a grid take the values
+   of that level; points outside of the model domain horizontally make
+   their circuit missing (missingval).
+   """
+   names = ['/3d_u/u', '/3d_v/v', '/3d_w/w', '/3d_s/thpert', 'th']
+   data = cm1.read_points(time, names, x, y, z, clamp_z=True)
+   u, v, w, thp, th = [np.where(np.isnan(data[name]), missingval, np.asarray(data[name], np.float64))
+                       for name in names]
+
+   C = dyn.circulation_batch(u, v, w, x, y, z)[0]
+   intBdz = dyn.integral_Bdz_batch(th, thp, z)
+   return C, intBdz
+
+#-------------------------------------------------------
+
+def integrate(cm1, filename, npoint=None, files=None):
+   """Evaluates circulation budgets along a trajectory file
+
+   :param cm1: :py:class:`pymeteo.cm1.read_hdf5.CM1` dataset
+   :param filename: trajectory file with /time, /x, /y and /z
+   :param npoint: points per circuit, defaults to one circuit of all points
+   :param files: CM1 file number for each trajectory time.  By default
+                 only the trajectory times that match the time of an
+                 output file are evaluated.
+   :returns: dict with time (nt,) and C, intBdz and intBdzdt (nt, ncircuit)
+
+   intBdzdt is the running trapezoidal time integral of intBdz.  Once a
+   circuit has a missing value it stays missing in intBdzdt.
+   """
+   with h5py.File(filename, 'r') as trajfile:
+      t = trajfile['/time'][:]
+      npoints = trajfile['/x'].shape[1]
+      npoint = npoint or npoints
+      ncircuit = npoints // npoint
+
+      if files is None:
+         ftimes = trajectories.file_times(cm1, cm1.dimT)
+         match = [(n, np.flatnonzero(np.isclose(ftimes, tt))) for n, tt in enumerate(t)]
+         match = [(n, cm1.dimT[m[0]]) for n, m in match if len(m)]
+      else:
+         match = list(enumerate(files))
+      nt = len(match)
+
+      budget = {'time': t[[n for n, f in match]]}
+      for name in ('C', 'intBdz', 'intBdzdt'):
+         budget[name] = np.empty((nt, ncircuit))
+
+      for m, (n, f) in enumerate(match):
+         # one time of positions at a time
+         x, y, z = [trajfile[name][n, :ncircuit*npoint].reshape((ncircuit, npoint)) for name in ('/x', '/y', '/z')]
+         C, intBdz = evaluate(cm1, f, x, y, z)
+         budget['C'][m] = C
+         budget['intBdz'][m] = intBdz
+
+         if m == 0:
+            budget['intBdzdt'][m] = np.where(intBdz == missingval, missingval, 0.)
+         else:
+            step = dyn.integral_dt_batch(budget['intBdz'][m-1:m+1].T, budget['time'][m-1:m+1])
+            prev = budget['intBdzdt'][m-1]
+            budget['intBdzdt'][m] = np.where((prev == missingval) | (step == missingval), missingval, prev + step)
+
+   return budget
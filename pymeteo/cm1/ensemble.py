@@ -0,0 +1,143 @@
+"""Ensembles of analytic CM1 input soundings
+
+Members are every combination of the values given for the sounding and
+hodograph parameters of :py:mod:`pymeteo.cm1.profiles`.  All members
+are generated at once, each is written as a CM1 ``input_sounding`` file
+and their CAPE and SRH are collected into one summary table.
+
+.. code-block:: python
+
+   from pymeteo.cm1 import ensemble, profiles
+
+   members = ensemble.generate(profiles.wk82, profiles.curved90,
+                               th_0=[299., 300., 301.],
+                               qv_0=[0.012, 0.014, 0.016],
+                               z_curve_top=[1000., 2000.])
+   ensemble.write(members, '/data/ensemble')
+   # /data/ensemble/input_sounding.0000 ... .0017 and summary.csv
+
+"""
+
+import os
+import numpy as np
+from pymeteo import thermo
+from pymeteo import dynamics as dyn
+from pymeteo.cm1 import profiles
+
+#-------------------------------------------------------
+
+def generate(sounding=profiles.wk82, hodograph=profiles.curved90, z=profiles.default_z, **values):
+   """Generates every combination of parameter values
+
+   :param sounding: sounding generator from :py:data:`pymeteo.cm1.profiles.soundings`
+   :param hodograph: hodograph generator from :py:data:`pymeteo.cm1.profiles.hodographs`
+   :param z: model levels (m)
+   :param values: parameter keyword of either generator -> list of values
+   :returns: dict with the (nmember,) parameter values under their
+             keywords, z (nk,), th, p, qv, u and v (nk, nmember), the
+             parameter keywords in order under 'parameters' and those of
+             the sounding under 'sounding_parameters'
+   """
+   sounding_args = set(arg for label, arg, units in sounding.options)
+   hodograph_args = set(arg for label, arg, units in hodograph.options)
+   for name in values:
+      if name not in sounding_args and name not in hodograph_args:
+         raise ValueError('Unknown parameter {0} for {1} and {2}'.format(
+                          name, sounding.__name__, hodograph.__name__))
+
+   names = list(values)
+   params = profiles.grid(**values)
+   nmember = len(params[names[0]]) if names else 1
+
+   z, th, p, qv = sounding(z, **dict((k, v) for k, v in params.items() if k in sounding_args))
+   z, u, v = hodograph(z, **dict((k, v) for k, v in params.items() if k in hodograph_args))
+
+   members = dict(params)
+   shape = (len(z), nmember)
+   for name, profile in (('th', th), ('p', p), ('qv', qv), ('u', u), ('v', v)):
+      members[name] = np.broadcast_to(np.reshape(profile, (len(z), -1)), shape)
+   members['z'] = z
+   members['parameters'] = names
+   members['sounding_parameters'] = [name for name in names if name in sounding_args]
+   return members
+
+def member(members, n):
+   """Profiles z, th, p, qv, u, v of one member"""
+   return (members['z'],) + tuple(members[name][:,n] for name in ('th', 'p', 'qv', 'u', 'v'))
+
+#-------------------------------------------------------
+
+def write_input_sounding(filename, z, th, p, qv, u, v):
+   """Writes a CM1 / WRF input_sounding file
+
+   The first level gives the surface line (pressure in mb, theta and qv
+   in g/kg), the levels above it the z, theta, qv, u and v lines.  The
+   whole file is formatted in one operation and written at once.
+   """
+   rows = np.column_stack((z[1:], th[1:], np.asarray(qv[1:])*1000., u[1:], v[1:]))
+   text = "{0:8.2f}\t{1:8.6f}\t{2:8.6f}\n".format(p[0]/100., th[0], qv[0]*1000.)
+   text += ('%8.2f\t%8.6f\t%8.6f\t%8.6f\t%8.6f\n' * len(rows)) % tuple(rows.ravel())
+   with open(filename, 'w') as f:
+      f.write(text)
+
+#-------------------------------------------------------
+
+summary_columns = ('cape', 'cin', 'mucape', 'mlcape', 'srh01', 'srh03', 'u_storm', 'v_storm')
+"""Summary table columns besides the member number and parameters"""
+
+def summarize(members):
+   """CAPE and SRH of every member
+
+   :returns: dict of :py:data:`summary_columns` -> (nmember,) arrays;
+             surface, most unstable and mixed layer CAPE and CIN in J/kg,
+             0-1 and 0-3 km SRH (m2/s2) for the Bunkers right mover
+             motion (m/s)
+
+   CAPE is computed once for each combination of sounding parameters and
+   shared by the members that differ only in their hodograph.
+   """
+   nmember = members['th'].shape[1]
+   table = dict((name, np.empty(nmember)) for name in summary_columns)
+   thermo_stats = {}
+   for n in range(nmember):
+      z, th, p, qv, u, v = member(members, n)
+      key = tuple(members[name][n] for name in members['sounding_parameters'])
+      if key not in thermo_stats:
+         T = thermo.T(th, p)
+         pcl = thermo.CAPE(z, p, T, qv, 1)
+         thermo_stats[key] = (pcl['cape'], pcl['cin'],
+                              thermo.CAPE(z, p, T, qv, 2)['cape'],
+                              thermo.CAPE(z, p, T, qv, 3)['cape'])
+      table['cape'][n], table['cin'][n], table['mucape'][n], table['mlcape'][n] = thermo_stats[key]
+      ucb = dyn.storm_motion_bunkers(u, v, z)
+      table['u_storm'][n], table['v_storm'][n] = ucb[0], ucb[1]
+      table['srh01'][n] = dyn.srh(u, v, z, 0., 1000., ucb[0], ucb[1])
+      table['srh03'][n] = dyn.srh(u, v, z, 0., 3000., ucb[0], ucb[1])
+   return table
+
+def write(members, path, prefix='input_sounding', summary='summary.csv'):
+   """Writes every member and the summary table
+
+   :param members: result of :py:func:`generate`
+   :param path: output directory, created if needed
+   :param prefix: member files are named prefix.NNNN
+   :param summary: filename of the CSV summary table in path, or None
+                   to skip the CAPE and SRH calculations
+   :returns: the summary table (see :py:func:`summarize`) or None
+   """
+   if not os.path.isdir(path):
+      os.makedirs(path)
+   nmember = members['th'].shape[1]
+   for n in range(nmember):
+      write_input_sounding(os.path.join(path, '{0}.{1:04d}'.format(prefix, n)), *member(members, n))
+   print('Wrote {0} soundings to {1}'.format(nmember, path))
+
+   if summary is None:
+      return None
+   table = summarize(members)
+   names = ['member'] + members['parameters'] + list(summary_columns)
+   columns = [np.arange(nmember)] + [members[name] for name in members['parameters']] + \
+             [table[name] for name in summary_columns]
+   np.savetxt(os.path.join(path, summary), np.column_stack(columns), delimiter=',',
+              fmt=['%d'] + ['%.6g'] * (len(names)-1), header=','.join(names), comments='')
+   return table
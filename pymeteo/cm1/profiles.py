@@ -0,0 +1,236 @@
+"""Analytic sounding and hodograph profiles for CM1 initialization
+
+These are the profiles behind the cm1_geninit sounding and hodograph
+tabs, without any Qt dependency.  Each generator takes the heights and
+its parameters as keywords and evaluates every level at once.
+Parameters may be scalars or arrays: array parameters are broadcast
+together and the profiles are returned with the levels first, shaped
+(nk,) + parameter shape, so many variants are computed in one call.
+
+Hodograph generators return (z, u, v) and sounding generators return
+(z, th, p, qv).  The GUI label, keyword and units of each parameter are
+listed in the generator's ``options``.
+
+.. code-block:: python
+
+   from pymeteo.cm1 import profiles
+
+   z, u, v = profiles.curved90(profiles.default_z, z_curve_top=1500.)
+
+   # 1000 WK82 variants, th is (nk, 1000)
+   params, (z, th, p, qv) = profiles.sweep(profiles.wk82,
+                                           th_0=np.linspace(298., 302., 10),
+                                           qv_0=np.linspace(0.011, 0.016, 100))
+
+"""
+
+import inspect
+import numpy as np
+from pymeteo import constants
+from pymeteo import thermo
+
+default_z = np.arange(0., 22000., 50.)
+"""Default model levels (m)"""
+
+#-------------------------------------------------------
+
+def _options(title, options):
+   # attaches the GUI description of the parameters to a generator
+   def decorate(func):
+      func.title = title
+      func.options = options
+      return func
+   return decorate
+
+def defaults(generator):
+   """Default parameters of a generator as a dict of keyword -> value"""
+   parameters = inspect.signature(generator).parameters
+   return dict((arg, parameters[arg].default) for label, arg, units in generator.options)
+
+def _levels(z, *params):
+   # broadcast the parameters together and shape z to (nk, 1, ...)
+   params = np.broadcast_arrays(*[np.asarray(p, np.float64) for p in params])
+   zz = np.asarray(z, np.float64).reshape((-1,) + (1,)*params[0].ndim)
+   shape = zz.shape[:1] + params[0].shape
+   return zz, shape, params
+
+#-------------------------------------------------------
+# Hodographs
+
+@_options('curved90 (quartercircle)',
+          [ ('z_curve,top',    'z_curve_top',    'm'),
+            ('z_constblo',     'z_constblo',     'm'),
+            ('z_constabv',     'z_constabv',     'm'),
+            ('u_straight,min', 'u_straight_min', 'm/s'),
+            ('u_straight,max', 'u_straight_max', 'm/s'),
+            ('straight,scale', 'straight_scale', ''),
+            ('u_adjust',       'u_adjust',       'm/s'),
+            ('v_adjust',       'v_adjust',       'm/s') ])
+def curved90(z=default_z, z_curve_top=2000., z_constblo=0., z_constabv=6000.,
+             u_straight_min=7., u_straight_max=31., straight_scale=1.,
+             u_adjust=0., v_adjust=0.):
+   """Quarter circle turning to a straight segment"""
+   zz, shape, (zdep1, zdep0, zdep2, umax1, umax2, sf, cx, cy) = _levels(
+      z, z_curve_top, z_constblo, z_constabv, u_straight_min, u_straight_max,
+      straight_scale, u_adjust, v_adjust)
+   with np.errstate(divide='ignore', invalid='ignore'):
+      a = ((zz-zdep0)/(zdep1-zdep0))*(np.pi/2.)
+      s = (zz-zdep1)/(zdep2-zdep1)
+      sections = [zz < zdep0, zz < zdep1, zz < zdep2]
+      u = np.select(sections, [0., umax1-umax1*np.cos(a),
+                               (umax1+s*(umax2-umax1))*(1+(sf-1)*s)], umax2*sf)
+      v = np.select(sections[:2], [0., umax1*np.sin(a)], umax1)
+   return z, np.broadcast_to(u, shape) - cx, np.broadcast_to(v, shape) - cy
+
+@_options('semicircle',
+          [ ('z_curve,top', 'z_curve_top', 'm'),
+            ('u_max',       'u_max',       'm/s'),
+            ('v_max',       'v_max',       'm/s'),
+            ('u_adjust',    'u_adjust',    'm/s'),
+            ('v_adjust',    'v_adjust',    'm/s') ])
+def semicircle(z=default_z, z_curve_top=6000., u_max=15., v_max=15., u_adjust=0., v_adjust=0.):
+   """Half circle below z_curve_top, constant above"""
+   zz, shape, (zdep1, umax, vmax, cx, cy) = _levels(z, z_curve_top, u_max, v_max, u_adjust, v_adjust)
+   a = np.pi-(zz/zdep1)*np.pi
+   u = np.where(zz < zdep1, umax*np.cos(a), umax)
+   v = np.where(zz < zdep1, vmax*np.sin(a), 0.)
+   return z, np.broadcast_to(u, shape) - cx, np.broadcast_to(v, shape) - cy
+
+@_options('curved90 (quartercircle)',
+          [ ('z_curve,top',    'z_curve_top',    'm'),
+            ('z_constabv',     'z_constabv',     'm'),
+            ('z_constblo',     'z_constblo',     'm'),
+            ('u_straight,min', 'u_straight_min', 'm/s'),
+            ('u_straight,max', 'u_straight_max', 'm/s'),
+            ('eccentricity',   'eccentricity',   ''),
+            ('u_adjust',       'u_adjust',       'm/s'),
+            ('v_adjust',       'v_adjust',       'm/s') ])
+def sickle(z=default_z, z_curve_top=500., z_constabv=6000., z_constblo=0.,
+           u_straight_min=12., u_straight_max=31., eccentricity=0.2,
+           u_adjust=0., v_adjust=0.):
+   """Elliptical low level curve turning to a straight segment"""
+   zz, shape, (zdep1, zdep2, zdep0, umax1, umax2, ecc, cx, cy) = _levels(
+      z, z_curve_top, z_constabv, z_constblo, u_straight_min, u_straight_max,
+      eccentricity, u_adjust, v_adjust)
+   with np.errstate(divide='ignore', invalid='ignore'):
+      a = ((zz-zdep0)/(zdep1-zdep0))*(np.pi/2.)+(3.*np.pi/2.)
+      s = (zz-zdep1)/(zdep2-zdep1)
+      sections = [zz < zdep0, zz < zdep1, zz < zdep2]
+      u = np.select(sections, [ecc*umax1, ecc*umax1+ecc*umax1*(-np.cos(a)),
+                               s*umax1+s*(umax2-umax1)], umax2)
+      v = np.select(sections[:2], [0., umax1*(1.+np.sin(a))], umax1)
+   return z, np.broadcast_to(u, shape) - cx, np.broadcast_to(v, shape) - cy
+
+@_options('straight (linear increase)',
+          [ ('z_constabv', 'z_constabv', 'm'),
+            ('z_constblo', 'z_constblo', 'm'),
+            ('u_max',      'u_max',      'm/s'),
+            ('u_scaling',  'u_scaling',  ''),
+            ('v_max',      'v_max',      'm/s'),
+            ('u_adjust',   'u_adjust',   'm/s'),
+            ('v_adjust',   'v_adjust',   'm/s') ])
+def straight(z=default_z, z_constabv=6000., z_constblo=0., u_max=30., u_scaling=1.,
+             v_max=7., u_adjust=0., v_adjust=0.):
+   """Linear u shear between z_constblo and z_constabv"""
+   zz, shape, (zdep1, zdep0, umax, sf, vmax, cx, cy) = _levels(
+      z, z_constabv, z_constblo, u_max, u_scaling, v_max, u_adjust, v_adjust)
+   with np.errstate(divide='ignore', invalid='ignore'):
+      s = (zz-zdep0)/(zdep1-zdep0)
+      u = np.select([zz < zdep0, zz < zdep1], [0., s*umax*(1+(sf-1)*s)], umax*sf)
+   return z, np.broadcast_to(u, shape) - cx, np.broadcast_to(vmax, shape) - cy
+
+@_options('straight (linear increase)',
+          [ ('z_constabv', 'z_constabv', 'm'),
+            ('z_llws,top', 'z_llws_top', 'm'),
+            ('u_llws',     'u_llws',     'm/s'),
+            ('u_max',      'u_max',      'm/s'),
+            ('u_scaling',  'u_scaling',  ''),
+            ('v_max',      'v_max',      'm/s'),
+            ('u_adjust',   'u_adjust',   'm/s'),
+            ('v_adjust',   'v_adjust',   'm/s') ])
+def straightllws(z=default_z, z_constabv=6000., z_llws_top=1000., u_llws=12., u_max=30.,
+                 u_scaling=1., v_max=7., u_adjust=0., v_adjust=0.):
+   """Straight hodograph with stronger low level shear below z_llws_top
+
+   u_scaling is accepted for compatibility and not used.
+   """
+   zz, shape, (zdep2, zdep1, ullws, umax, vmax, cx, cy) = _levels(
+      z, z_constabv, z_llws_top, u_llws, u_max, v_max, u_adjust, v_adjust)
+   with np.errstate(divide='ignore', invalid='ignore'):
+      u = np.select([zz < zdep1, zz < zdep2],
+                    [(zz/zdep1)*ullws, ullws+(zz-zdep1)*(umax-ullws)/(zdep2-zdep1)], umax)
+   return z, np.broadcast_to(u, shape) - cx, np.broadcast_to(vmax, shape) - cy
+
+hodographs = { 'curved90'     : curved90,
+               'semicircle'   : semicircle,
+               'sickle'       : sickle,
+               'straight'     : straight,
+               'straightllws' : straightllws }
+"""Hodograph generators by name"""
+
+#-------------------------------------------------------
+# Soundings
+
+@_options('Weisman-Klemp 82 Analytic Sounding',
+          [ ('z_tr',     'z_tr',     'm'),
+            ('theta_tr', 'theta_tr', 'K'),
+            ('T_tr',     'T_tr',     'K'),
+            ('th_0',     'th_0',     'K'),
+            ('qv_0',     'qv_0',     'kg/kg'),
+            ('p_0',      'p_0',      'Pa') ])
+def wk82(z=default_z, z_tr=12000., theta_tr=343., T_tr=213., th_0=300., qv_0=0.014, p_0=100000.):
+   """Weisman and Klemp (1982) analytic sounding
+
+   Pressure and moisture are iterated to hydrostatic consistency with
+   :py:func:`pymeteo.thermo.hydrostatic_moist`.
+   """
+   zz, shape, (z_tr, th_tr, t_tr, th_sfc, qv_pbl, p_sfc) = _levels(
+      z, z_tr, theta_tr, T_tr, th_0, qv_0, p_0)
+
+   pi_sfc = (p_sfc/constants.p00)**(constants.Rd/constants.cp)
+   qv_sfc = thermo.q_vl(p_sfc,th_sfc*pi_sfc)
+   thv_sfc = th_sfc*(1.+qv_sfc*constants.reps)/(1.+qv_sfc)
+
+   # WK82 pp 506
+   trop = zz <= z_tr
+   th = np.where(trop, th_sfc + (th_tr - th_sfc)*((zz/z_tr)**(1.25)),
+                 th_tr * np.exp((constants.gravity/(constants.cp*t_tr))*(zz-z_tr)))
+   rh = np.where(trop, 1.0-0.75*((zz/z_tr)**1.25), 0.25)
+   th = np.array(np.broadcast_to(th, shape))
+
+   # moisture depends on pressure, iterate to a consistent profile
+   p, pi, qv = thermo.hydrostatic_moist(zz, th, p_sfc,
+                                        lambda p, t: np.minimum(rh*thermo.q_vl(p, t), qv_pbl),
+                                        z0=0., thv0=thv_sfc)
+   return z, th, p, qv
+
+soundings = { 'WK82' : wk82 }
+"""Sounding generators by name"""
+
+#-------------------------------------------------------
+
+def grid(**values):
+   """Every combination of parameter values
+
+   :param values: parameter keyword -> list of values
+   :returns: dict of parameter keyword -> (nmember,) values of each
+             member, varying fastest in the last keyword
+   """
+   names = list(values)
+   grids = np.meshgrid(*[np.atleast_1d(np.asarray(values[name], np.float64)) for name in names],
+                       indexing='ij')
+   return dict((name, g.ravel()) for name, g in zip(names, grids))
+
+def sweep(generator, z=default_z, **values):
+   """Evaluates a generator over every combination of parameter values
+
+   :param generator: a hodograph or sounding generator
+   :param z: model levels (m)
+   :param values: parameter keyword -> list of values; parameters not
+                  given keep their defaults
+   :returns: dict of parameter keyword -> (nmember,) values of each
+             member (see :py:func:`grid`), and the generator output with
+             profiles shaped (nk, nmember)
+   """
+   params = grid(**values)
+   return params, generator(z, **params)
@@ -1,16 +1,32 @@
 """Class to read GRaDS style CM1 model output data
 
+The parsed control file metadata is cached in a sidecar file next to
+the control file (``<ctl>.cache``) and reused as long as the control
+file is unchanged, so opening a dataset only parses the control file
+once.
+
 """
-#TODO exception throwing?  Error handling, support the u,v,w,stats files
+#TODO exception throwing?  Error handling
 
+import os
+import json
 import numpy as np
 import mmap
+from pymeteo.cm1 import slabs
+
+grids = ('s', 'u', 'v', 'w', 'stats')
+"""CM1 GrADS output files: scalar, staggered u/v/w and domain statistics"""
+
+cache_version = 1
+"""Format version of the parsed control file cache, increase it whenever
+the output of :py:func:`parse_ctl` changes"""
 
 class CM1(object):
    """Class that implements reading CM1 model data
 
    :param path: path to CM1 data files
    :param datasetname: the CM1 data files basename
+   :param grid: which output files to read, one of :py:data:`grids`
    
    """
    nx   = 0
@@ -34,8 +50,11 @@ class CM1(object):
    dimT = 0
    """T grid dimension (1D)"""
    vars = 0
+   varindex = {}
+   """variable name -> variable information, see :py:meth:`getVarByName`"""
    n2d  = 0
    recl = 0
+   grid = 's'
    dsetname = ''
    path = ''
    mem_file = 0
@@ -43,121 +62,101 @@ class CM1(object):
 
 #-------------------------------------------------------
 
-   def __init__(self,__path,__datasetname):
+   def __init__(self,__path,__datasetname,grid='s'):
       
+      if grid not in grids:
+         raise ValueError('Unknown grid: {0}'.format(grid))
+
       self.path = __path
       self.dsetname = __datasetname
+      self.grid = grid
 
       #We need to open the control file and read the dataset metadata 
 
-      #create filename.  This assumes cm1 created files and the scalar file at that.
-      ctl_filename = self.path + '/' + self.dsetname + '_s.ctl'
-
-      # open the control file
-      with open(ctl_filename, 'r') as ctl_file:
-         print('Opened '+ ctl_filename+ ' for reading')
-         #read ctl file
-         self.parsectl(ctl_file)
-      #close ctl file
-      ctl_file.closed
-      print(ctl_filename+ ' closed')
+      #create filename.  This assumes cm1 created files.
+      ctl_filename = self.path + '/' + self.dsetname + '_' + self.grid + '.ctl'
+
+      # use the cached metadata if the control file has not changed
+      stat = os.stat(ctl_filename)
+      key = [stat.st_mtime, stat.st_size]
+      cache_filename = ctl_filename + '.cache'
+      meta = None
+      try:
+         with open(cache_filename, 'r') as cache_file:
+            meta = json.load(cache_file)
+         if meta.get('version') != cache_version or meta.get('key') != key:
+            meta = None
+      except (IOError, OSError, ValueError):
+         meta = None
+
+      if meta is None:
+         with open(ctl_filename, 'r') as ctl_file:
+            print('Parsing '+ ctl_filename)
+            meta = parse_ctl(ctl_file.read().splitlines())
+         meta['version'] = cache_version
+         meta['key'] = key
+         try:
+            with open(cache_filename, 'w') as cache_file:
+               json.dump(meta, cache_file)
+         except (IOError, OSError):
+            # read-only dataset directory, just parse again next time
+            pass
+
+      self.setmetadata(meta)
 
 #-------------------------------------------------------
-#  This function currently only works for cm1 domains with stretched x/y/z grids.
 
    def parsectl(self,ctl_file):
+      """Parses an open control file and sets the dataset metadata"""
+      self.setmetadata(parse_ctl(ctl_file.read().splitlines()))
 
-      print('  Parsing control file')
-      line = ctl_file.readline()
-      while line:
-         # This finds the line that describes the X dimension
-        if line.startswith('xdef'):
-          nX = [int(s) for s in line.split() if s.isdigit()].pop()
-          print('    Found X with {0} values'.format(nX))
-          X = []
-          for i in range(nX):
-            line = ctl_file.readline()
-            X.append(float(line))
-          if nX != len(X):
-            print('Error: Expected {0} values, read {1} values, exiting!'.format(nX,len(X)))
-            quit()
-          self.dimX = np.array(X)
-          self.nx = nX
-
-         # This finds the line that describes the Y dimension
-        if line.startswith('ydef'):
-          nY = [int(s) for s in line.split() if s.isdigit()].pop()
-          print('    Found Y with {0} values'.format(nY))
-          Y = []
-          for i in range(nY):
-            line = ctl_file.readline()
-            Y.append(float(line))
-          if nY != len(Y):
-            print('Error: Expected {0} values, read {1} values, exiting!'.format(nY,len(Y)))
-            quit()
-          self.dimY = np.array(Y)
-          self.ny = nY
-
-         # This finds the line that describes the Z dimension
-        if line.startswith('zdef'):
-          nZ = [int(s) for s in line.split() if s.isdigit()].pop()
-          print('    Found Z with {0} values'.format(nZ))
-          Z = []
-          for i in range(nZ):
-            line = ctl_file.readline()
-            Z.append(float(line))
-          if nZ != len(Z):
-            print('Error: Expected {0} values, read {1} values, exiting!'.format(nZ,len(Z)))
-            quit()
-          self.dimZ = np.array(Z)
-          self.nz = nZ
-
-         # This finds the line that describes the time dimension
-        if line.startswith('tdef'):
-          nT = [s for s in line.split()]
-          self.nt = int(nT[1])
-          self.dt = float([s for s in nT[4].split('YR')][0])
-          print('    Found T with {0} steps of {1} s'.format(self.nt, self.dt))
-          T = []
-          for i in range(self.nt):
-            T.append(float(i*self.dt))
-            self.dimT = np.array(T)
-
-         # This finds the line that begins the variable declaration
-        if line.startswith('vars'):
-          nV = [int(s) for s in line.split() if s.isdigit()].pop()
-          print('    Found {0} variables'.format(nV))
-          V = []
-          for i in range(nV):
-            line = ctl_file.readline()
-            newV = [i+1] #varid
-
-            vdef = ([s for s in line.split(None,3)])
-            newV.append(vdef[0]) # varname
-            newV.append(int(vdef[1])) #levels
-            if int(vdef[1]) == 0:
-              self.n2d = self.n2d + 1
-            newV.append(vdef[3].rstrip()) # description
-            newV = tuple(newV)
-
-            V.append(newV)
-          if nV != len(V):
-            print('Error: Expected {0} values, read {1} values, exiting!'.format(nV,len(V)))
-            quit()
-          self.vars = V
-          self.nv = nV
-          #eat the endvars line
-          line = ctl_file.readline()
-
-        line = ctl_file.readline()
-      
+#-------------------------------------------------------
+
+   def setmetadata(self, meta):
+      self.nx = meta['nx']
+      self.ny = meta['ny']
+      self.nz = meta['nz']
+      self.nt = meta['nt']
+      self.dt = meta['dt']
+      self.dimX = np.array(meta['dimX'])
+      self.dimY = np.array(meta['dimY'])
+      self.dimZ = np.array(meta['dimZ'])
+      self.dimT = np.arange(self.nt) * self.dt
+      self.vars = [tuple(v) for v in meta['vars']]
+      self.nv = len(self.vars)
+      self.n2d = sum(1 for v in self.vars if v[2] == 0)
+      self.varindex = dict((v[1], {'id': v[0], 'name': v[1], 'nlevs': v[2], 'desc': v[3]}) for v in self.vars)
       self.recl = self.nx * self.ny * 4
 
 #-------------------------------------------------------
 
    def getVarByName(self,varname):
-      idx = [i for i in self.vars if i[1] == varname]
-      return {'id': int(idx[0][0]), 'name': idx[0][1], 'nlevs': int(idx[0][2]), 'desc': idx[0][3]}
+      """Returns the id, name, number of levels and description of a variable"""
+      try:
+         return self.varindex[varname]
+      except KeyError:
+         raise ValueError('Unknown variable {0} in {1}_{2}.ctl'.format(varname, self.dsetname, self.grid))
+
+#-------------------------------------------------------
+
+   def datafilename(self, time):
+      """Returns the data file name of a time level"""
+      if self.grid == 'stats':
+         return self.path + '/' + self.dsetname + '_stats.dat'
+      return self.path + '/' + self.dsetname + '_{0:06d}_{1}.dat'.format(int(time), self.grid)
+
+#-------------------------------------------------------
+# The stats file holds one value of every variable per time level
+
+   def read_stats(self, varname):
+      """Reads the time series of a domain statistic
+
+      :param varname: the variable name in the stats control file
+      :returns: array of nt values
+      """
+      var = self.getVarByName(varname)
+      data = np.fromfile(self.datafilename(0), dtype=np.float32)
+      return data[:self.nt*self.nv].reshape((self.nt, self.nv))[:, var['id']-1]
 
 #-------------------------------------------------------
 # This function reads count number of bytes sequentially from location loc
@@ -227,7 +226,7 @@ class CM1(object):
       var = self.getVarByName(varname)
 
       # open dat file 
-      dat_filename = self.path + '/' + self.dsetname + '_{0:06d}_s.dat'.format(int(time))
+      dat_filename = self.datafilename(time)
 
       print('  Opening {0} for reading'.format(dat_filename))
       print('    Reading {0}({1}) at time {2} s'.format(varname, var['id'], time))
@@ -260,7 +259,7 @@ class CM1(object):
    def read3dMultStart(self,time):
 
       # create datafile name
-      dat_filename = self.path + '/' + self.dsetname + '_{0:06d}_s.dat'.format(int(time))
+      dat_filename = self.datafilename(time)
       print('  Opening {0} for reading'.format(dat_filename))
       print('    Reading time {0} s'.format(time))
    
@@ -295,6 +294,133 @@ class CM1(object):
       return data
 
 #-------------------------------------------------------
+# Reads a subdomain of several 3d variables through a memory map so
+#  only the records and rows inside the subdomain are touched.
 
-# def get var by id, get varid by name
-# def var exists?
+   def read3d_subdomain(self, time, varnames, ib, ie, jb, je, kb, ke):
+      """Reads a subdomain of several 3D variables
+
+      :param time: the timelevel to read
+      :param varnames: list of variable names to read
+      :param ib,ie,jb,je,kb,ke: grid index bounds of the subdomain
+      :returns: dict of varname -> (ie-ib, je-jb, ke-kb) array indexed (x, y, z)
+      """
+      dat_filename = self.datafilename(time)
+      print('    Reading {0} from ({1}:{2},{3}:{4},{5}:{6}) at time {7} s'.format(', '.join(varnames), ib, ie, jb, je, kb, ke, time))
+
+      memmap = np.memmap(dat_filename, dtype=np.float32, mode='r')
+      data = {}
+      for varname in varnames:
+         vid = self.getVarByName(varname)['id']
+         start = (self.n2d+(vid-1-self.n2d)*(self.nz)) * self.nx * self.ny
+         vol = memmap[start:start+self.nz*self.nx*self.ny].reshape((self.nz, self.ny, self.nx))
+         data[varname] = np.array(vol[kb:ke, jb:je, ib:ie]).T
+      del memmap
+      return data
+
+#-------------------------------------------------------
+# Walks 3d variables in bounded-memory slabs.  The data file stays
+#  memory mapped for the life of the generator.
+
+   def read3d_slabs(self, time, varnames, axis='k', max_memory=slabs.default_max_memory, prefetch=False):
+      """Yields slabs of several 3D variables that fit a memory budget
+
+      :param time: the timelevel to read
+      :param varnames: list of variable names to read
+      :param axis: 'k' for horizontal slabs (k-ranges) or 'j' for j-ranges
+      :param max_memory: memory budget for one slab of all variables (bytes)
+      :param prefetch: read the next slab on a background thread
+      :returns: generator of ((begin, end), {varname: array}) tuples
+
+      Arrays are indexed (x, y, z) as returned by :py:meth:`read3d`.
+      """
+      vids = [self.getVarByName(varname)['id'] for varname in varnames]
+
+      dat_filename = self.datafilename(time)
+      print('  Opening {0} for reading'.format(dat_filename))
+      print('    Reading {0} in {1}-slabs at time {2} s'.format(', '.join(varnames), axis, time))
+
+      if axis == 'k':
+         n = self.nz
+         bytes_per_index = len(vids) * self.recl
+      elif axis == 'j':
+         n = self.ny
+         bytes_per_index = len(vids) * self.nx * self.nz * 4
+      else:
+         raise ValueError('Unsupported slab axis: {0}'.format(axis))
+
+      memmap = np.memmap(dat_filename, dtype=np.float32, mode='r')
+      try:
+         # each variable is nz records of (ny, nx), x varying fastest
+         volumes = []
+         for vid in vids:
+            start = (self.n2d+(vid-1-self.n2d)*(self.nz)) * self.nx * self.ny
+            volumes.append(memmap[start:start+self.nz*self.nx*self.ny].reshape((self.nz, self.ny, self.nx)))
+
+         def read_slab(b, e):
+            data = {}
+            for varname, vol in zip(varnames, volumes):
+               if axis == 'k':
+                  data[varname] = np.array(vol[b:e, :, :]).T
+               else:
+                  data[varname] = np.array(vol[:, b:e, :]).T
+            return data
+
+         ranges = slabs.slab_ranges(n, bytes_per_index, max_memory)
+         for r, data in slabs.iterate(read_slab, ranges, prefetch):
+            yield r, data
+      finally:
+         del memmap
+         print('  {0} closed'.format(dat_filename))
+
+#-------------------------------------------------------
+
+# def get var by id
+
+#-------------------------------------------------------
+
+def _dim(lines, i, name):
+   # parses an xdef/ydef/zdef entry starting at lines[i]
+   words = lines[i].split()
+   n = int(words[1])
+   if words[2].lower() == 'linear':
+      return np.arange(n) * float(words[4]) + float(words[3]), i+1
+   values = words[3:]
+   while len(values) < n:
+      i += 1
+      values += lines[i].split()
+   if len(values) != n:
+      raise ValueError('Expected {0} {1} values, read {2}'.format(n, name, len(values)))
+   return np.array(values, dtype=np.float64), i+1
+
+def parse_ctl(lines):
+   """Parses the lines of a CM1 GrADS control file
+
+   :param lines: list of control file lines
+   :returns: dict of the metadata used by :py:class:`CM1`
+   """
+   meta = {}
+   i = 0
+   while i < len(lines):
+      line = lines[i]
+      keyword = line.split(None, 1)[0].lower() if line.strip() else ''
+      if keyword in ('xdef', 'ydef', 'zdef'):
+         dim, i = _dim(lines, i, keyword[0])
+         meta['n' + keyword[0]] = len(dim)
+         meta['dim' + keyword[0].upper()] = dim.tolist()
+         continue
+      elif keyword == 'tdef':
+         words = line.split()
+         meta['nt'] = int(words[1])
+         meta['dt'] = float(words[4].upper().split('YR')[0])
+      elif keyword == 'vars':
+         nv = int(line.split()[1])
+         V = []
+         for n in range(nv):
+            vdef = lines[i+1+n].split(None, 3)
+            # varid, varname, levels, description
+            V.append((n+1, vdef[0], int(vdef[1]), vdef[3].rstrip() if len(vdef) > 3 else ''))
+         meta['vars'] = V
+         i += nv + 1
+      i += 1
+   return meta
@@ -8,9 +8,11 @@
 import numpy as np
 import mmap
 import h5py
-import glob
-import re
 import os
+from pymeteo.constants import *
+import pymeteo.thermo as thermo
+import pymeteo.interp
+from pymeteo.cm1 import slabs, catalog
 
 class CM1(object):
    nx   = 0
@@ -21,6 +23,8 @@ class CM1(object):
    nzp1 = 0
    nt   = 0
    dt   = 0
+   """nominal output interval (s), the first step; use times when the
+   output is not evenly spaced"""
    dimX = 0
    dimY = 0
    dimZ = 0
@@ -28,6 +32,10 @@ class CM1(object):
    dimV = 0
    dimW = 0
    dimT = 0
+   """file numbers in time order"""
+   times = 0
+   """model time (s) of each file in dimT"""
+   catalog = None
    dsetname = ''
    path = ''
    datafile = 0
@@ -49,20 +57,11 @@ class CM1(object):
 
    def getmetadata(self):
 
-      # This searches files that describe the time dimension
-      cm1hdf_files = glob.glob("{0}/{1}*h5".format(self.path, self.dsetname))
-      cm1hdf_files.sort()
-      # replaces curved90-qv14.(\d{5}).h5  with \1
-      self.dimT = np.array([int(re.sub(r'{0}.(\d{{5}}).h5'.format(self.dsetname),r'\1',os.path.basename(f))) for f in cm1hdf_files])
-      if len(self.dimT) == 0:
+      # The catalog lists the files and their model times
+      self.catalog = catalog.Catalog(self.path, self.dsetname)
+      if len(self.catalog) == 0:
          raise ValueError('Invalid dataset specified: {0}/{1}'.format(self.path, self.dsetname))
-#TODO: check dimT, if 0 then no dataset found, bail out
-      self.nt   = len(self.dimT)
-      #self.dt   = self.dimT[1] - self.dimT[0]
-      self.dt = 15
-      self.nt = 601
-      # TODO!!!! FIX THIS
-      print('    Found T with {0} steps of {1} s'.format(self.nt, self.dt))
+      self.settimes()
 
       filename = "{0}/{1}.{2:05d}.h5".format(self.path, self.dsetname, self.dimT[0])
       print('  Getting metadata from {0}'.format(filename))
@@ -95,6 +94,23 @@ class CM1(object):
 
       cm1file.close()
 
+#-------------------------------------------------------
+
+   def settimes(self):
+      self.dimT = self.catalog.numbers
+      self.times = self.catalog.times
+      self.nt = len(self.dimT)
+      self.dt = float(self.times[1] - self.times[0]) if self.nt > 1 else 0.
+      print('    Found T with {0} steps of {1} s'.format(self.nt, self.dt))
+      steps = np.diff(self.times)
+      if len(steps) and not np.allclose(steps, self.dt):
+         print('    Output interval varies from {0} to {1} s'.format(steps.min(), steps.max()))
+
+   def refresh(self):
+      """Picks up output files written since the dataset was opened"""
+      if self.catalog.refresh():
+         self.settimes()
+
 #-------------------------------------------------------
 
    def read2d_slice(self, time, ib, ie, jb, je, varname):
@@ -139,12 +155,170 @@ class CM1(object):
       nz = ke-kb
 
       data = np.empty((nz, ny, nx), dtype=np.float32)
-      # Have to transpose before right-broadcasting doesnt work
-      data = (datafile[varname3D][kb:ke, jb:je, ib:ie].T + datafile[varname1D][kb:ke].T).T
+      datafile[varname3D].read_direct(data, np.s_[kb:ke, jb:je, ib:ie])
+      # add the base state in place, broadcast along k
+      data += datafile[varname1D][kb:ke].reshape((nz, 1, 1))
 
       datafile.close()
       return data
 
+#-------------------------------------------------------
+# Reads fields from the derived variable registry (derived_vars below)
+
+   def read3d_derived(self, time, ib, ie, jb, je, kb, ke, varnames):
+      """Reads derived variables in a subdomain
+
+      :param time: the timelevel to read
+      :param ib,ie,jb,je,kb,ke: scalar grid index bounds of the subdomain
+      :param varnames: list of names from :py:data:`derived_vars`
+      :returns: dict of varname -> (nz, ny, nx) array
+      """
+      filename = self.path + '/' + self.dsetname + '.{0:05d}.h5'.format(int(time))
+      print('    Reading {0} from ({1}:{2},{3}:{4},{5}:{6}) at time {7} s'.format(', '.join(varnames), ib, ie, jb, je, kb, ke, time))
+
+      with h5py.File(filename, 'r') as datafile:
+         data = derive(datafile, varnames, ib, ie, jb, je, kb, ke)
+
+      return data
+
+#-------------------------------------------------------
+
+   def read_winds(self, time, ib, ie, jb, je, kb, ke):
+      """Reads u, v and w interpolated to the scalar points of a subdomain
+
+      :param time: the timelevel to read
+      :param ib,ie,jb,je,kb,ke: scalar grid index bounds of the subdomain
+      :returns: u, v, w (nz, ny, nx) arrays
+      """
+      data = self.read3d_derived(time, ib, ie, jb, je, kb, ke, ['uinterp', 'vinterp', 'winterp'])
+      return data['uinterp'], data['vinterp'], data['winterp']
+
+#-------------------------------------------------------
+
+   def derived_slabs(self, time, varnames, axis='k', max_memory=slabs.default_max_memory, prefetch=False):
+      """Yields slabs of derived variables that fit a memory budget
+
+      :param time: the timelevel to read
+      :param varnames: list of names from :py:data:`derived_vars`
+      :param axis: 'k' for horizontal slabs (k-ranges) or 'j' for j-ranges
+      :param max_memory: memory budget for one slab (bytes)
+      :param prefetch: compute the next slab on a background thread
+      :returns: generator of ((begin, end), {varname: array}) tuples
+      """
+      filename = self.path + '/' + self.dsetname + '.{0:05d}.h5'.format(int(time))
+      print('    Reading {0} in {1}-slabs at time {2} s'.format(', '.join(varnames), axis, time))
+
+      # output buffers, inputs and scratch space for one point
+      bytes_per_point = 4 * derived_buffers(varnames)
+
+      with h5py.File(filename, 'r') as datafile:
+         if axis == 'k':
+            ranges = slabs.slab_ranges(self.nz, bytes_per_point*self.nx*self.ny, max_memory)
+            read_slab = lambda b, e: derive(datafile, varnames, 0, self.nx, 0, self.ny, b, e)
+         elif axis == 'j':
+            ranges = slabs.slab_ranges(self.ny, bytes_per_point*self.nx*self.nz, max_memory)
+            read_slab = lambda b, e: derive(datafile, varnames, 0, self.nx, b, e, 0, self.nz)
+         else:
+            raise ValueError('Unsupported slab axis: {0}'.format(axis))
+
+         for r, data in slabs.iterate(read_slab, ranges, prefetch):
+            yield r, data
+
+
+#-------------------------------------------------------
+
+   def read_isobaric(self, time, varnames, plevs, max_memory=slabs.default_max_memory, prefetch=False):
+      """Reads derived variables interpolated to isobaric levels
+
+      :param time: the timelevel to read
+      :param varnames: list of names from :py:data:`derived_vars`
+      :param plevs: list of pressure levels (Pa), e.g. [85000, 70000, 50000]
+      :param max_memory: memory budget for one j-slab of model levels (bytes)
+      :param prefetch: compute the next slab on a background thread
+      :returns: dict of varname -> (len(plevs), ny, nx) array
+
+      The domain is walked in j-slabs of full columns so only the
+      isobaric output has to fit in memory for the whole domain.
+      """
+      data = {name: np.empty((len(plevs), self.ny, self.nx), np.float32) for name in varnames}
+
+      for (jb, je), slab in self.derived_slabs(time, list(set(varnames) | {'prs'}), 'j', max_memory, prefetch):
+         isobaric = pymeteo.interp.interp_to_pressure(slab['prs'], plevs, [slab[name] for name in varnames])
+         for name, var in zip(varnames, isobaric):
+            data[name][:, jb:je, :] = var
+
+      return data
+
+#-------------------------------------------------------
+
+   def grid_coords(self, grid):
+      """Returns the (x, y, z) coordinates (km) of a grid
+
+      :param grid: 's' for scalar points or 'u', 'v', 'w' for the staggered grids
+      """
+      if grid == 's':
+         return self.dimX, self.dimY, self.dimZ
+      elif grid == 'u':
+         return self.dimU, self.dimY, self.dimZ
+      elif grid == 'v':
+         return self.dimX, self.dimV, self.dimZ
+      elif grid == 'w':
+         return self.dimX, self.dimY, self.dimW
+      raise ValueError('Unknown grid: {0}'.format(grid))
+
+#-------------------------------------------------------
+# Samples variables at arbitrary points, reading only the bounding
+#  box of the points on each variable's grid.
+
+   def read_points(self, time, varnames, px, py, pz, fill=np.nan, clamp_z=True):
+      """Interpolates variables to arbitrary points
+
+      :param time: the timelevel to read
+      :param varnames: HDF5 variable paths (e.g. '/3d_u/u', on their own
+                       staggered grid) or names from :py:data:`derived_vars`
+                       (on the scalar grid)
+      :param px, py, pz: point coordinates (km), arrays of the same shape
+      :param fill: value for points outside of the domain
+      :param clamp_z: hold points below the lowest or above the highest
+                      level of each grid at that level instead of filling
+                      them; points outside of the domain horizontally are
+                      always filled
+      :returns: dict of varname -> array shaped like px
+      """
+      filename = self.path + '/' + self.dsetname + '.{0:05d}.h5'.format(int(time))
+      print('    Reading {0} at {1} points at time {2} s'.format(', '.join(varnames), np.size(px), time))
+
+      data = {}
+      with h5py.File(filename, 'r') as datafile:
+         # group the variables by grid so each bounding box is read once
+         grids = {}
+         for varname in varnames:
+            if varname in derived_vars:
+               grid = 's'
+            else:
+               grid = {(self.nz, self.ny, self.nxp1): 'u',
+                       (self.nz, self.nyp1, self.nx): 'v',
+                       (self.nzp1, self.ny, self.nx): 'w'}.get(datafile[varname].shape, 's')
+            grids.setdefault(grid, []).append(varname)
+
+         for grid, names in grids.items():
+            x, y, z = self.grid_coords(grid)
+            zp = np.clip(pz, z[0], z[-1]) if clamp_z else pz
+            ib, ie = pymeteo.interp.bounding_box(x, px)
+            jb, je = pymeteo.interp.bounding_box(y, py)
+            kb, ke = pymeteo.interp.bounding_box(z, zp)
+
+            derived = [name for name in names if name in derived_vars]
+            box = derive(datafile, derived, ib, ie, jb, je, kb, ke) if derived else {}
+            for name in names:
+               if name not in derived_vars:
+                  box[name] = datafile[name][kb:ke, jb:je, ib:ie]
+
+            values = pymeteo.interp.trilinear_many(x[ib:ie], y[jb:je], z[kb:ke], [box[name] for name in names],
+                                                   px, py, zp, fill)
+            data.update(zip(names, values))
+
+      return data
 
 #-------------------------------------------------------
 # Reads a single 3d variable from the datafile
@@ -228,6 +402,55 @@ class CM1(object):
 
       return np.array(data).T
 
+#-------------------------------------------------------
+# Walks 3d variables in bounded-memory slabs.  The file stays open
+#  for the life of the generator.
+
+   def read3d_slabs(self, time, varnames, axis='k', max_memory=slabs.default_max_memory, prefetch=False):
+      """Yields slabs of several 3D variables that fit a memory budget
+
+      :param time: the timelevel to read
+      :param varnames: list of HDF5 variable paths (e.g. '/3d_s/thpert')
+      :param axis: 'k' for horizontal slabs (k-ranges) or 'j' for j-ranges
+      :param max_memory: memory budget for one slab of all variables (bytes)
+      :param prefetch: read the next slab on a background thread
+      :returns: generator of ((begin, end), {varname: array}) tuples
+
+      Arrays are indexed (x, y, z) as returned by :py:meth:`read3dMult`
+      and by the GrADS reader.  Ranges are in scalar grid indices; variables
+      staggered along the slab axis (w for 'k', v for 'j') get one extra
+      point so that they can be averaged to the scalar points of the
+      slab, and u and v keep their extra staggered point in x and y.
+      """
+      filename = self.path + '/' + self.dsetname + '.{0:05d}.h5'.format(int(time))
+      print('    Reading {0} in {1}-slabs at time {2} s'.format(', '.join(varnames), axis, time))
+
+      if axis == 'k':
+         dim, n = 0, self.nz
+      elif axis == 'j':
+         dim, n = 1, self.ny
+      else:
+         raise ValueError('Unsupported slab axis: {0}'.format(axis))
+
+      with h5py.File(filename, 'r') as datafile:
+         dsets = [datafile[varname] for varname in varnames]
+         bytes_per_index = sum(ds.dtype.itemsize * ds.size // ds.shape[dim] for ds in dsets)
+
+         def read_slab(b, e):
+            data = {}
+            for varname, ds in zip(varnames, dsets):
+               # one extra point for variables staggered along the slab axis
+               ee = e + ds.shape[dim] - n
+               if dim == 0:
+                  data[varname] = ds[b:ee, :, :].T
+               else:
+                  data[varname] = ds[:, b:ee, :].T
+            return data
+
+         ranges = slabs.slab_ranges(n, bytes_per_index, max_memory)
+         for r, data in slabs.iterate(read_slab, ranges, prefetch):
+            yield r, data
+
 #-------------------------------------------------------
 
    def restrict_bounds(self,east,west,north,south,height):
@@ -257,3 +480,174 @@ class CM1(object):
 #-------------------------------------------------------
 # def get var by id, get varid by name
 # def var exists?
+
+#-------------------------------------------------------
+# Derived variables
+#
+# Each derived variable is computed in place into its own output
+#  buffer from the raw HDF5 fields of one subdomain.  Raw reads and
+#  intermediate fields are shared between all of the fields requested
+#  in a single call to derive().
+
+class _DerivedSource(object):
+   """Raw and derived fields of one subdomain of an open HDF5 file"""
+
+   def __init__(self, datafile, ib, ie, jb, je, kb, ke):
+      self.datafile = datafile
+      self.ib, self.ie = ib, ie
+      self.jb, self.je = jb, je
+      self.kb, self.ke = kb, ke
+      self.shape = (ke-kb, je-jb, ie-ib)
+      self.fields = {}
+      self.raw = {}
+      self.scratch_buf = None
+
+   def read(self, varname, out=None):
+      """Reads a 3D field, with one extra point along staggered dimensions"""
+      if varname in self.raw:
+         if out is None:
+            return self.raw[varname]
+         out[...] = self.raw[varname]
+         return out
+      ds = self.datafile[varname]
+      dk = ds.shape[0] - int(self.datafile['/grid/nz'][()])
+      dj = ds.shape[1] - int(self.datafile['/grid/ny'][()])
+      di = ds.shape[2] - int(self.datafile['/grid/nx'][()])
+      shape = (self.shape[0]+dk, self.shape[1]+dj, self.shape[2]+di)
+      if out is None or out.shape != shape:
+         out = np.empty(shape, np.float32)
+         self.raw[varname] = out
+      ds.read_direct(out, np.s_[self.kb:self.ke+dk, self.jb:self.je+dj, self.ib:self.ie+di])
+      return out
+
+   def base(self, varname):
+      """Reads a 1D base state variable shaped to broadcast along k"""
+      return self.datafile[varname][self.kb:self.ke].astype(np.float32).reshape((self.shape[0], 1, 1))
+
+   def get(self, name):
+      """Returns a derived field, computing it on first use"""
+      if name not in self.fields:
+         out = np.empty(self.shape, np.float32)
+         derived_vars[name][0](self, out)
+         self.fields[name] = out
+      return self.fields[name]
+
+   def scratch(self):
+      """Returns a scratch buffer the size of the subdomain"""
+      if self.scratch_buf is None:
+         self.scratch_buf = np.empty(self.shape, np.float32)
+      return self.scratch_buf
+
+def _derive_th(src, out):
+   src.read('/3d_s/thpert', out)
+   out += src.base('/basestate/th0')
+
+def _derive_prs(src, out):
+   src.read('/3d_s/ppert', out)
+   out += src.base('/basestate/pres0')
+
+def _derive_qv(src, out):
+   src.read('/3d_s/qvpert', out)
+   out += src.base('/basestate/qv0')
+
+def _derive_T(src, out):
+   # T = th * (p/p00)**(Rd/cp)
+   np.multiply(src.get('prs'), rp00, out=out)
+   np.power(out, rddcp, out=out)
+   out *= src.get('th')
+
+def _derive_Td(src, out):
+   # same formulation as thermo.Td
+   qv = src.get('qv')
+   s = src.scratch()
+   old_settings = np.seterr(all='ignore')
+   np.divide(qv, epsilon, out=out)
+   np.add(out, 1., out=s)
+   out /= s
+   out *= src.get('prs')
+   out *= 0.01
+   np.log(out, out=out)
+   np.multiply(out, 243.5, out=s)
+   s -= 440.8
+   np.subtract(19.48, out, out=out)
+   np.divide(s, out, out=out)
+   out += T00
+   np.seterr(**old_settings)
+
+def _derive_thetae(src, out):
+   thermo.th_e_array(src.get('prs'), src.get('T'), src.get('Td'), src.get('qv'), out=out)
+
+def _derive_thv(src, out):
+   # thv = th*(1+reps*qv)/(1+qv), as in thermo.CAPE
+   qv = src.get('qv')
+   s = src.scratch()
+   np.multiply(qv, reps, out=out)
+   out += 1.
+   np.add(qv, 1., out=s)
+   out /= s
+   out *= src.get('th')
+
+def _derive_uinterp(src, out):
+   pymeteo.interp.destagger(src.read('/3d_u/u'), 2, out=out)
+
+def _derive_vinterp(src, out):
+   pymeteo.interp.destagger(src.read('/3d_v/v'), 1, out=out)
+
+def _derive_winterp(src, out):
+   pymeteo.interp.destagger(src.read('/3d_w/w'), 0, out=out)
+
+derived_vars = {
+   'th'      : (_derive_th,      ['/3d_s/thpert', '/basestate/th0']),
+   'prs'     : (_derive_prs,     ['/3d_s/ppert', '/basestate/pres0']),
+   'qv'      : (_derive_qv,      ['/3d_s/qvpert', '/basestate/qv0']),
+   'T'       : (_derive_T,       ['th', 'prs']),
+   'Td'      : (_derive_Td,      ['qv', 'prs']),
+   'thetae'  : (_derive_thetae,  ['prs', 'T', 'Td', 'qv']),
+   'thv'     : (_derive_thv,     ['th', 'qv']),
+   'uinterp' : (_derive_uinterp, ['/3d_u/u']),
+   'vinterp' : (_derive_vinterp, ['/3d_v/v']),
+   'winterp' : (_derive_winterp, ['/3d_w/w']),
+}
+"""Registry of derived variables.  Maps name -> (function, inputs)
+
+Each function takes a subdomain source and the output buffer to fill.
+Inputs are either HDF5 variable paths or other derived variable names.
+"""
+
+def derived_buffers(varnames):
+   """Counts the subdomain-sized buffers needed to derive varnames
+
+   :param varnames: list of names from :py:data:`derived_vars`
+   :returns: number of buffers (outputs, shared intermediates and scratch)
+   """
+   needed = set()
+   raw = set()
+   def walk(name):
+      if name in needed:
+         return
+      needed.add(name)
+      for dep in derived_vars[name][1]:
+         if dep.startswith('/'):
+            # perturbations are read straight into the output buffer
+            if dep.startswith('/3d_u') or dep.startswith('/3d_v') or dep.startswith('/3d_w'):
+               raw.add(dep)
+         else:
+            walk(dep)
+   for name in varnames:
+      walk(name)
+   return len(needed) + len(raw) + 1
+
+def derive(datafile, varnames, ib, ie, jb, je, kb, ke):
+   """Computes derived variables in a subdomain of an open CM1 HDF5 file
+
+   :param datafile: an open :py:class:`h5py.File`
+   :param varnames: list of names from :py:data:`derived_vars`
+   :param ib,ie,jb,je,kb,ke: scalar grid index bounds of the subdomain
+   :returns: dict of varname -> (nz, ny, nx) array
+   """
+   for name in varnames:
+      if name not in derived_vars:
+         raise ValueError('Unknown derived variable: {0}'.format(name))
+
+   src = _DerivedSource(datafile, ib, ie, jb, je, kb, ke)
+   return {name: src.get(name) for name in varnames}
@@ -0,0 +1,52 @@
+"""Helpers for walking CM1 model volumes in bounded-memory slabs
+
+These are used by the CM1 readers to split a 3D variable into k-ranges
+(horizontal slabs) or j-ranges (vertical slabs) that fit a memory budget
+and to optionally read the next slab on a background thread while the
+caller works on the current one.
+
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+default_max_memory = 256 * 1024**2
+"""Default memory budget for one slab of all requested variables (bytes)"""
+
+#-------------------------------------------------------
+
+def slab_ranges(n, bytes_per_index, max_memory=default_max_memory):
+   """Splits n indices into contiguous ranges that fit a memory budget
+
+   :param n: number of indices along the slab axis
+   :param bytes_per_index: bytes needed to hold one index of every variable
+   :param max_memory: memory budget for one slab (bytes)
+   :returns: list of (begin, end) index tuples covering 0..n
+   """
+   step = int(max_memory // max(bytes_per_index, 1))
+   if step < 1:
+      raise ValueError('max_memory of {0} bytes is too small for a single slab index ({1} bytes)'.format(
+                       max_memory, bytes_per_index))
+   return [(b, min(b+step, n)) for b in range(0, n, step)]
+
+#-------------------------------------------------------
+
+def iterate(read_slab, ranges, prefetch=False):
+   """Yields (range, data) for each range, optionally reading ahead
+
+   :param read_slab: function taking (begin, end) and returning the slab data
+   :param ranges: list of (begin, end) tuples from :py:func:`slab_ranges`
+   :param prefetch: if True, read the next slab on a background thread
+   """
+   if not prefetch:
+      for r in ranges:
+         yield r, read_slab(*r)
+      return
+
+   with ThreadPoolExecutor(max_workers=1) as pool:
+      future = None
+      for i, r in enumerate(ranges):
+         if future is None:
+            future = pool.submit(read_slab, *r)
+         data = future.result()
+         future = pool.submit(read_slab, *ranges[i+1]) if i+1 < len(ranges) else None
+         yield r, data
@@ -0,0 +1,181 @@
+"""Parcel trajectories through CM1 HDF5 output
+
+Parcels are advanced with second or fourth order Runge-Kutta steps
+through the u, v and w fields on their staggered grids, interpolated
+trilinearly in space and linearly in time between output files.  Only
+the wind volumes of the two output times bracketing the current step
+are held in memory, parcels are advanced as arrays in chunks, and the
+positions are written to HDF5 after every step, so large ensembles run
+in bounded memory.
+
+The output file has the layout read by :py:mod:`pymeteo.cm1.circuits`
+
+   * /time -- (nt,) model times (s)
+   * /x, /y, /z -- (nt, nparcel) parcel positions (km)
+
+Parcels that leave the domain horizontally become NaN.  Vertical
+positions are kept between the lowest and highest w levels.
+
+.. code-block:: python
+
+   from pymeteo.cm1 import read_hdf5, trajectories
+
+   cm1 = read_hdf5.CM1('/data/run', 'cm1out')
+   # backward trajectories from t=3600 s to t=1800 s with 2 s steps
+   trajectories.integrate(cm1, x0, y0, z0, 3600., 1800., 2., 'traj.h5')
+
+"""
+
+import math
+import numpy as np
+import h5py
+import pymeteo.interp
+
+default_chunk = 2**20
+"""Parcels advanced at once"""
+
+#-------------------------------------------------------
+
+def file_times(cm1, files):
+   """Reads the model time (s) of each output file
+
+   :param cm1: :py:class:`pymeteo.cm1.read_hdf5.CM1` dataset
+   :param files: list of file numbers
+   :returns: array of times
+   """
+   if cm1.catalog is not None:
+      return np.array([cm1.catalog.entry(n)['time'] for n in files])
+   times = []
+   for n in files:
+      filename = cm1.path + '/' + cm1.dsetname + '.{0:05d}.h5'.format(int(n))
+      with h5py.File(filename, 'r') as datafile:
+         times.append(float(datafile['/time'][0]))
+   return np.array(times)
+
+#-------------------------------------------------------
+
+class _Winds(object):
+   """Winds at parcel positions from the two files bracketing a time"""
+
+   names = [('/3d_u/u', 'u'), ('/3d_v/v', 'v'), ('/3d_w/w', 'w')]
+
+   def __init__(self, cm1, files, times):
+      self.cm1 = cm1
+      self.files = files
+      self.times = times
+      self.volumes = {}
+
+   def _volume(self, n):
+      if n not in self.volumes:
+         filename = self.cm1.path + '/' + self.cm1.dsetname + '.{0:05d}.h5'.format(int(self.files[n]))
+         print('    Reading winds from {0}'.format(filename))
+         with h5py.File(filename, 'r') as datafile:
+            self.volumes[n] = [datafile[name][:] for name, grid in self.names]
+      return self.volumes[n]
+
+   def bracket(self, n):
+      """Keeps only the volumes of files n and n+1"""
+      for m in list(self.volumes):
+         if m not in (n, n+1):
+            del self.volumes[m]
+
+   def __call__(self, n, t, x, y, z):
+      """Velocity (km/s) at time t between files n and n+1"""
+      a = (t - self.times[n]) / (self.times[n+1] - self.times[n])
+      velocity = []
+      for (name, grid), v0, v1 in zip(self.names, self._volume(n), self._volume(n+1)):
+         gx, gy, gz = self.cm1.grid_coords(grid)
+         # below the lowest or above the highest level use the nearest level
+         zc = np.clip(z, gz[0], gz[-1])
+         i0, i1 = pymeteo.interp.trilinear_many(gx, gy, gz, [v0, v1], x, y, zc)
+         velocity.append(((1.-a)*i0 + a*i1) / 1000.)
+      return velocity
+
+#-------------------------------------------------------
+
+def _rk2(f, t, dt, x, y, z):
+   k1 = f(t, x, y, z)
+   k2 = f(t+0.5*dt, x+0.5*dt*k1[0], y+0.5*dt*k1[1], z+0.5*dt*k1[2])
+   return x+dt*k2[0], y+dt*k2[1], z+dt*k2[2]
+
+def _rk4(f, t, dt, x, y, z):
+   k1 = f(t, x, y, z)
+   k2 = f(t+0.5*dt, x+0.5*dt*k1[0], y+0.5*dt*k1[1], z+0.5*dt*k1[2])
+   k3 = f(t+0.5*dt, x+0.5*dt*k2[0], y+0.5*dt*k2[1], z+0.5*dt*k2[2])
+   k4 = f(t+dt, x+dt*k3[0], y+dt*k3[1], z+dt*k3[2])
+   return tuple(p + dt/6.*(a + 2.*b + 2.*c + d) for p, a, b, c, d in zip((x, y, z), k1, k2, k3, k4))
+
+methods = {'rk2': _rk2, 'rk4': _rk4}
+"""Available integration methods"""
+
+def steps(times, t0, t1, dt):
+   """Splits [t0, t1] into steps of at most dt that do not cross file times
+
+   :returns: list of (n, t, dt) with n the bracketing file interval
+   """
+   direction = 1. if t1 >= t0 else -1.
+   inner = [t for t in times if min(t0, t1) < t < max(t0, t1)]
+   breaks = sorted([t0, t1] + inner, reverse=(direction < 0))
+   result = []
+   for ta, tb in zip(breaks[:-1], breaks[1:]):
+      nsub = max(int(math.ceil(abs(tb-ta)/abs(dt) - 1e-9)), 1)
+      n = int(np.clip(np.searchsorted(times, 0.5*(ta+tb)) - 1, 0, len(times)-2))
+      for m in range(nsub):
+         result.append((n, float(ta + (tb-ta)*m/nsub), float((tb-ta)/nsub)))
+   return result
+
+def integrate(cm1, x0, y0, z0, t0, t1, dt, output, method='rk4', files=None, times=None, chunk=default_chunk):
+   """Integrates parcel trajectories and writes them to an HDF5 file
+
+   :param cm1: :py:class:`pymeteo.cm1.read_hdf5.CM1` dataset
+   :param x0, y0, z0: starting positions (km), 1D arrays
+   :param t0: starting time (s)
+   :param t1: ending time (s), before t0 for backward trajectories
+   :param dt: largest time step (s); steps are shortened to end on output times
+   :param output: filename of the trajectory file to write
+   :param method: 'rk2' or 'rk4'
+   :param files: file numbers to use, defaults to cm1.dimT
+   :param times: model time of each file (s), read from the files by default
+   :param chunk: number of parcels advanced at once
+   :returns: final x, y, z positions (km)
+   """
+   if method not in methods:
+      raise ValueError('Unknown integration method: {0}'.format(method))
+   if np.size(x0) == 0:
+      raise ValueError('No parcels to integrate')
+   step = methods[method]
+   files = cm1.dimT if files is None else files
+   times = file_times(cm1, files) if times is None else np.asarray(times, np.float64)
+   if min(t0, t1) < times[0] or max(t0, t1) > times[-1]:
+      raise ValueError('Times {0} to {1} s are not covered by the files ({2} to {3} s)'.format(
+                       t0, t1, times[0], times[-1]))
+
+   x = np.array(x0, np.float64)
+   y = np.array(y0, np.float64)
+   z = np.array(z0, np.float64)
+   nparcel = len(x)
+   zmin, zmax = cm1.dimW[0], cm1.dimW[-1]
+
+   winds = _Winds(cm1, files, times)
+   schedule = steps(times, t0, t1, dt)
+   print('  Integrating {0} parcels from {1} s to {2} s in {3} steps'.format(nparcel, t0, t1, len(schedule)))
+
+   with h5py.File(output, 'w') as trajfile:
+      shape = (len(schedule)+1, nparcel)
+      chunks = (1, min(nparcel, chunk))
+      dsets = [trajfile.create_dataset(name, shape, np.float32, chunks=chunks) for name in ('x', 'y', 'z')]
+      trajfile['time'] = np.array([t0] + [t+h for n, t, h in schedule])
+      for dset, p in zip(dsets, (x, y, z)):
+         dset[0] = p
+
+      for s, (n, t, h) in enumerate(schedule):
+         winds.bracket(n)
+         f = lambda tt, xx, yy, zz: winds(n, tt, xx, yy, zz)
+         for b in range(0, nparcel, chunk):
+            e = min(b+chunk, nparcel)
+            x[b:e], y[b:e], z[b:e] = step(f, t, h, x[b:e], y[b:e], z[b:e])
+         np.clip(z, zmin, zmax, out=z)
+         for dset, p in zip(dsets, (x, y, z)):
+            dset[s+1] = p
+
+   return x, y, z
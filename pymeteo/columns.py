@@ -0,0 +1,237 @@
+"""
+.. module:: pymeteo.columns
+   :platform: Unix
+   :synopsis: Parallel per-column diagnostics over model domains
+
+This module runs a function on every column of a model domain using all
+cores.  The domain is split into tiles which are read in the parent
+process and handed to a :py:class:`concurrent.futures.ProcessPoolExecutor`
+through shared memory, and the workers write their results straight
+into shared output arrays, so no field data is pickled.
+
+A column function takes a dict of 1D profiles (one per source field)
+and returns a dict of results.  It must be defined at module level so
+that it can be sent to the workers.
+
+.. code-block:: python
+
+   from pymeteo import columns
+   from pymeteo.cm1 import read_hdf5
+
+   cm1 = read_hdf5.CM1('/data/run', 'cm1out')
+   source = columns.CM1HDF5Source(cm1, 3600, ['prs', 'T', 'qv'])
+   out = columns.map_columns(source, columns.cape, {'cape': 0, 'cin': 0})
+   # out['cape'] and out['cin'] are (ny, nx) arrays
+
+Module Reference
+++++++++++++++++
+"""
+
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import pymeteo.thermo as thermo
+import pymeteo.dynamics as dyn
+import pymeteo.wrf as wrf
+
+default_tile = (32, 32)
+"""Default tile size (ny, nx) in columns"""
+
+#-------------------------------------------------------
+# Sources
+#
+# A source describes the domain (nz, ny, nx) and reads tiles of its
+#  fields as a dict of (nz, je-jb, ie-ib) arrays when called with
+#  (ib, ie, jb, je).  The name 'z' is the height of each level (m).
+
+class CM1HDF5Source(object):
+    """Reads tiles of a CM1 HDF5 dataset
+
+    :param cm1: :py:class:`pymeteo.cm1.read_hdf5.CM1` dataset
+    :param time: the timelevel to read
+    :param varnames: names from :py:data:`pymeteo.cm1.read_hdf5.derived_vars` or 'z'
+    """
+
+    def __init__(self, cm1, time, varnames):
+        self.cm1 = cm1
+        self.time = time
+        self.varnames = varnames
+        self.shape = (cm1.nz, cm1.ny, cm1.nx)
+
+    def __call__(self, ib, ie, jb, je):
+        names = [name for name in self.varnames if name != 'z']
+        data = self.cm1.read3d_derived(self.time, ib, ie, jb, je, 0, self.cm1.nz, names)
+        if 'z' in self.varnames:
+            z = self.cm1.dimZ * 1000.
+            data['z'] = np.broadcast_to(z.reshape((-1, 1, 1)), (self.cm1.nz, je-jb, ie-ib))
+        return data
+
+class CM1GradsSource(object):
+    """Reads tiles of a CM1 GrADS dataset
+
+    :param cm1: :py:class:`pymeteo.cm1.read_grads.CM1` dataset
+    :param time: the timelevel to read
+    :param varnames: variable names in the control file or 'z'
+    """
+
+    def __init__(self, cm1, time, varnames):
+        self.cm1 = cm1
+        self.time = time
+        self.varnames = varnames
+        self.shape = (cm1.nz, cm1.ny, cm1.nx)
+
+    def __call__(self, ib, ie, jb, je):
+        names = [name for name in self.varnames if name != 'z']
+        data = self.cm1.read3d_subdomain(self.time, names, ib, ie, jb, je, 0, self.cm1.nz)
+        # (x, y, z) -> (z, y, x)
+        data = dict((name, var.T) for name, var in data.items())
+        if 'z' in self.varnames:
+            z = self.cm1.dimZ * 1000.
+            data['z'] = np.broadcast_to(z.reshape((-1, 1, 1)), (self.cm1.nz, je-jb, ie-ib))
+        return data
+
+class WRFSource(object):
+    """Reads tiles of a WRF NetCDF file
+
+    :param f: open WRF NetCDF dataset
+    :param time: time index
+    :param varnames: names accepted by :py:func:`pymeteo.wrf.read_fields`
+                     or 'z' (same as 'Z')
+    """
+
+    def __init__(self, f, time, varnames):
+        self.f = f
+        self.time = time
+        self.varnames = varnames
+        self.shape = f.variables['P'].shape[1:]
+
+    def __call__(self, ib, ie, jb, je):
+        names = ['Z' if name == 'z' else name for name in self.varnames]
+        data = wrf.read_fields(self.f, self.time, names, ib, ie, jb, je)
+        return dict((name, data[wname]) for name, wname in zip(self.varnames, names))
+
+#-------------------------------------------------------
+# Column functions
+
+def cape(column, parcel=1, z='z', p='prs', t='T', qv='qv'):
+    """CAPE and CIN of a column (use functools.partial to pick the
+    parcel or the field names of the source)
+
+    :returns: dict with cape and cin (J/kg)
+    """
+    pcl = thermo.CAPE(column[z], column[p], column[t], column[qv], parcel)
+    return {'cape': pcl['cape'], 'cin': pcl['cin']}
+
+def srh(column, depth=3000., z='z', u='uinterp', v='vinterp'):
+    """Storm relative helicity of a column for Bunkers right mover motion
+
+    :returns: dict with srh (m2/s2)
+    """
+    ucb = dyn.storm_motion_bunkers(column[u], column[v], column[z])
+    return {'srh': dyn.srh(column[u], column[v], column[z], 0., depth, ucb[0], ucb[1])}
+
+def wetbulb(column, z='z', p='prs', th='th', qv='qv'):
+    """Wet-bulb temperature profile of a column
+
+    :returns: dict with twb (C) at each level
+    """
+    return {'twb': [thermo.Twb(column[z], column[p], column[th], column[qv], zlvl) for zlvl in column[z]]}
+
+#-------------------------------------------------------
+# Mapper
+
+def _attach(name, shape):
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, np.float32, buffer=shm.buf)
+
+def _map_tile(func, varnames, tile, tile_shape, outputs, jb, ib):
+    # runs in a worker: apply func to each column of one tile
+    shm, data = _attach(tile, (len(varnames),) + tile_shape)
+    shms = [shm]
+    out = {}
+    for name, (shm_name, shape) in outputs.items():
+        shm, out[name] = _attach(shm_name, shape)
+        shms.append(shm)
+    try:
+        nz, nj, ni = tile_shape
+        for j in range(nj):
+            for i in range(ni):
+                column = dict((name, data[n,:,j,i]) for n, name in enumerate(varnames))
+                result = func(column)
+                for name in outputs:
+                    out[name][..., jb+j, ib+i] = result[name]
+    finally:
+        # views must be released before the blocks can be closed
+        column = None
+        del data, out
+        for shm in shms:
+            shm.close()
+
+def map_columns(source, func, outputs, tile=default_tile, workers=None):
+    """Applies a function to every column of a domain in parallel
+
+    :param source: a tile source such as :py:class:`CM1HDF5Source`
+    :param func: module level function taking a dict of 1D profiles and
+                 returning a dict with an entry for each output
+    :param outputs: dict of output name -> number of levels, 0 for
+                    scalars (2D output) or n for profiles (3D output)
+    :param tile: tile size (ny, nx) in columns
+    :param workers: number of processes, defaults to the number of cores
+    :returns: dict of output name -> (ny, nx) or (n, ny, nx) array
+
+    The parent reads the next tiles while the workers compute; at most
+    two tiles per worker are held in memory at once.
+    """
+    nz, ny, nx = source.shape
+    workers = workers or os.cpu_count()
+    varnames = list(source.varnames)
+
+    tiles = [(jb, min(jb+tile[0], ny), ib, min(ib+tile[1], nx))
+             for jb in range(0, ny, tile[0]) for ib in range(0, nx, tile[1])]
+
+    # outputs for the whole domain live in shared memory
+    results = {}
+    shared = []
+    try:
+        for name, nlev in outputs.items():
+            shape = (nlev, ny, nx) if nlev else (ny, nx)
+            shm = shared_memory.SharedMemory(create=True, size=4*int(np.prod(shape)))
+            shared.append(shm)
+            results[name] = (shm, np.ndarray(shape, np.float32, buffer=shm.buf))
+            results[name][1][...] = np.nan
+        out_spec = dict((name, (shm.name, array.shape)) for name, (shm, array) in results.items())
+
+        pending = []
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for jb, je, ib, ie in tiles:
+                data = source(ib, ie, jb, je)
+                tile_shape = (nz, je-jb, ie-ib)
+                shm = shared_memory.SharedMemory(create=True, size=4*len(varnames)*int(np.prod(tile_shape)))
+                shared.append(shm)
+                buf = np.ndarray((len(varnames),) + tile_shape, np.float32, buffer=shm.buf)
+                for n, name in enumerate(varnames):
+                    buf[n] = data[name]
+                del buf, data
+                pending.append((shm, pool.submit(_map_tile, func, varnames, shm.name, tile_shape, out_spec, jb, ib)))
+
+                # bound the tiles in flight
+                while len(pending) > 2*workers:
+                    _finish(pending.pop(0), shared)
+            while pending:
+                _finish(pending.pop(0), shared)
+
+        return dict((name, np.array(array)) for name, (shm, array) in results.items())
+    finally:
+        results.clear()
+        for shm in shared:
+            shm.close()
+            shm.unlink()
+
+def _finish(job, shared):
+    shm, future = job
+    future.result()
+    shared.remove(shm)
+    shm.close()
+    shm.unlink()
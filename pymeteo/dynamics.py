@@ -88,7 +88,7 @@ def circulation(u, v, w, x, y, z):
      (y == missingval).any() or \
      (z == missingval).any():
 
-     del uavg, vavg, wavg, dx, dy, dz, vdotdl1, vdotdl2
+     del uavg, vavg, wavg, vdotdl1, vdotdl2
      return (missingval, 0, 0)
 
         # calculate wind and dl around the circuit
@@ -168,6 +168,76 @@ def integral_dt(i, t):
    return integral
 
 
+# Batched versions of the circuit routines above.  Each circuit is a row
+#  of a (ncircuit, npoint) array and a circuit with any point equal to
+#  missingval gives missingval.
+
+def _missing(*arrays):
+    """Returns a (ncircuit,) mask of circuits with missing points"""
+    bad = np.zeros(np.shape(arrays[0])[0], bool)
+    for a in arrays:
+        bad |= (np.asarray(a) == missingval).any(axis=1)
+    return bad
+
+def circulation_batch(u, v, w, x, y, z):
+    """Calculates the circulation of many material circuits
+
+    :param u, v, w: winds at the circuit points (m/s), (ncircuit, npoint)
+    :param x, y, z: positions of the circuit points (km), (ncircuit, npoint)
+    :returns: C (ncircuit,) in m2/s and vdotdl1, vdotdl2 (ncircuit, npoint)
+              as returned by :py:func:`circulation`
+    """
+    bad = _missing(u, v, w, x, y, z)
+    u, v, w, x, y, z = [np.ma.masked_array(a, np.broadcast_to(bad[:,np.newaxis], np.shape(a)), np.float64)
+                        for a in (u, v, w, x, y, z)]
+
+    # wind on and length of each segment, closing the circuit
+    dx = np.roll(x, -1, axis=1) - x
+    dy = np.roll(y, -1, axis=1) - y
+    dz = np.roll(z, -1, axis=1) - z
+
+    # assumes clockwise parcels
+    vdotdl1 = -0.5*(u + np.roll(u, -1, axis=1))*dx \
+              -0.5*(v + np.roll(v, -1, axis=1))*dy \
+              -0.5*(w + np.roll(w, -1, axis=1))*dz
+    vdotdl2 = vdotdl1 / np.ma.sqrt(dx**2 + dy**2 + dz**2)
+
+    C = vdotdl1.sum(axis=1) * km2m   # m2/s
+    return C.filled(missingval), (vdotdl1*km2m).filled(0.), vdotdl2.filled(0.)
+
+def integral_Bdz_batch(th, thp, z):
+    """Calculates the baroclinic generation term of many circuits
+
+    :param th, thp: potential temperature and its perturbation at the
+                    circuit points (K), (ncircuit, npoint)
+    :param z: heights of the circuit points (km), (ncircuit, npoint)
+    :returns: integral of B dz around each circuit (m2/s2), (ncircuit,)
+    """
+    bad = _missing(th, thp, z)
+    th, thp, z = [np.ma.masked_array(a, np.broadcast_to(bad[:,np.newaxis], np.shape(a)), np.float64)
+                  for a in (th, thp, z)]
+
+    th_avg = 0.5 * (th + np.roll(th, -1, axis=1))
+    thp_avg = 0.5 * (thp + np.roll(thp, -1, axis=1))
+    dz = np.roll(z, -1, axis=1) - z
+
+    intBdz = np.sum(-dz * gravity * thp_avg/(th_avg - thp_avg), axis=1) * km2m  # m2/s2
+    return intBdz.filled(missingval)
+
+def integral_dt_batch(i, t):
+    """Integrates many time series with the trapezoidal rule
+
+    :param i: values to integrate, (ncircuit, ntime)
+    :param t: times (ntime,)
+    :returns: time integral of each row, missingval for rows with missing values
+    """
+    bad = _missing(i)
+    i = np.ma.masked_array(i, np.broadcast_to(bad[:,np.newaxis], np.shape(i)), np.float64)
+    dt = np.ediff1d(t)
+    integral = np.sum(0.5 * (i[:,:-1] + i[:,1:]) * dt, axis=1)
+    return integral.filled(missingval)
+
+
 # helper functions
 
 def uv_to_deg(u,v):
@@ -110,3 +110,146 @@ def interp_pressure(p, z, zlvl):
    #print(pres)
    return pres
 
+
+def destagger(var, axis, out=None):
+   """Averages C-grid staggered values to the scalar points between them
+
+   :param var: array with n+1 staggered points along axis
+   :param axis: the staggered axis
+   :param out: optional array to hold the result
+   :returns: array with n points along axis
+
+   Works on columns, slabs or full volumes; the n+1 staggered points
+   are read once and averaged pairwise without Python loops.
+   """
+   var = np.asarray(var)
+   lo = [slice(None)] * var.ndim
+   hi = [slice(None)] * var.ndim
+   lo[axis] = slice(0, -1)
+   hi[axis] = slice(1, None)
+   out = np.add(var[tuple(lo)], var[tuple(hi)], out=out)
+   out *= 0.5
+   return out
+
+def interp_to_pressure(p, plevs, variables, axis=0, fill=np.nan):
+   """Interpolates variables from model levels to isobaric levels
+
+   :param p: pressure (Pa) on model levels, decreasing along axis
+   :param plevs: list of pressure levels to interpolate to (Pa)
+   :param variables: list of arrays of the same shape as p
+   :param axis: the vertical axis of p and the variables
+   :param fill: value for levels outside of a column
+   :returns: list of arrays with the vertical axis replaced by plevs
+
+   Interpolation is linear in log(p), as in :py:func:`interp_height`.
+   Every column is done at once: the bracketing model levels of each
+   isobaric level are found by counting the levels with higher
+   pressure along the vertical axis.
+   """
+   p = np.moveaxis(np.asarray(p), axis, 0)
+   variables = [np.moveaxis(np.asarray(var), axis, 0) for var in variables]
+   nk = p.shape[0]
+   logp = np.log(p)
+
+   results = [np.empty((len(plevs),) + var.shape[1:], np.result_type(var, np.float32)) for var in variables]
+
+   for n, plvl in enumerate(plevs):
+      # index of the first level at or above plvl
+      k1 = np.clip(np.count_nonzero(p > plvl, axis=0), 1, nk-1)[np.newaxis]
+      k0 = k1 - 1
+      lp0 = np.take_along_axis(logp, k0, 0)[0]
+      lp1 = np.take_along_axis(logp, k1, 0)[0]
+      w = (lp0 - np.log(plvl)) / (lp0 - lp1)
+      outside = (w < 0.) | (w > 1.)
+      for var, result in zip(variables, results):
+         v0 = np.take_along_axis(var, k0, 0)[0]
+         v1 = np.take_along_axis(var, k1, 0)[0]
+         result[n] = v0 + w * (v1 - v0)
+         result[n][outside] = fill
+
+   return [np.moveaxis(result, 0, axis) for result in results]
+
+default_chunk = 2**20
+"""Points interpolated at once by :py:func:`trilinear_many`"""
+
+def bounding_box(dim, points):
+   """Returns the index range of a grid axis needed to interpolate to points
+
+   :param dim: 1D increasing grid coordinates
+   :param points: point coordinates on this axis
+   :returns: (begin, end) indices including the cells around the points
+   """
+   lo = np.searchsorted(dim, np.nanmin(points)) - 1
+   hi = np.searchsorted(dim, np.nanmax(points)) + 1
+   lo = min(max(lo, 0), len(dim)-2)
+   return lo, min(max(hi, lo+2), len(dim))
+
+def locate(dim, points):
+   """Finds the grid cell of points along one axis
+
+   :param dim: 1D increasing grid coordinates (may be stretched)
+   :param points: point coordinates on this axis
+   :returns: lower cell index, fractional distance across the cell and
+             a mask of points outside of dim
+   """
+   dim = np.asarray(dim, np.float64)
+   i = np.clip(np.searchsorted(dim, points) - 1, 0, len(dim)-2)
+   frac = (points - dim[i]) / (dim[i+1] - dim[i])
+   outside = (points < dim[0]) | (points > dim[-1]) | np.isnan(points)
+   return i, frac, outside
+
+def trilinear_many(x, y, z, variables, px, py, pz, fill=np.nan, chunk=default_chunk):
+   """Trilinearly interpolates several 3D fields on one grid to points
+
+   :param x, y, z: 1D increasing grid coordinates of the variables
+   :param variables: list of (len(z), len(y), len(x)) arrays
+   :param px, py, pz: point coordinates (arrays of the same shape)
+   :param fill: value for points outside of the grid
+   :param chunk: number of points to process at once
+   :returns: list of arrays of interpolated values shaped like px
+
+   The cell of each point is located once with searchsorted on each
+   axis and used for every variable.  Points are processed in chunks
+   so temporary arrays stay bounded for millions of points.
+   """
+   px, py, pz = np.broadcast_arrays(np.asarray(px, np.float64), np.asarray(py, np.float64),
+                                    np.asarray(pz, np.float64))
+   shape = px.shape
+   px, py, pz = px.ravel(), py.ravel(), pz.ravel()
+   results = [np.empty(px.size, np.result_type(var, np.float32)) for var in variables]
+
+   for b in range(0, px.size, chunk):
+      e = min(b+chunk, px.size)
+      k, fz, outz = locate(z, pz[b:e])
+      j, fy, outy = locate(y, py[b:e])
+      i, fx, outx = locate(x, px[b:e])
+      outside = outz | outy | outx
+
+      corners = []
+      for dk, wz in ((0, 1.-fz), (1, fz)):
+         for dj, wy in ((0, 1.-fy), (1, fy)):
+            for di, wx in ((0, 1.-fx), (1, fx)):
+               corners.append((k+dk, j+dj, i+di, wz*wy*wx))
+
+      for var, result in zip(variables, results):
+         value = np.zeros(e-b)
+         for kk, jj, ii, w in corners:
+            value += w * var[kk, jj, ii]
+         value[outside] = fill
+         result[b:e] = value
+
+   return [result.reshape(shape) for result in results]
+
+def trilinear(x, y, z, var, px, py, pz, fill=np.nan, chunk=default_chunk):
+   """Trilinearly interpolates a 3D field to arbitrary points
+
+   :param x, y, z: 1D increasing grid coordinates of var
+   :param var: (len(z), len(y), len(x)) array
+   :param px, py, pz: point coordinates (arrays of the same shape)
+   :param fill: value for points outside of the grid
+   :param chunk: number of points to process at once
+   :returns: array of interpolated values shaped like px
+
+   See :py:func:`trilinear_many`.
+   """
+   return trilinear_many(x, y, z, [var], px, py, pz, fill, chunk)[0]
@@ -34,6 +34,8 @@ High level plotting functions
 * :py:func:`plot_wrf` -- plots skewt from WRF generated NetCDF output
 * :py:func:`plot_sounding_data` -- plots skewt from CM1/WRF input sounding files
 * :py:func:`plot_sounding_data_uwyo` -- plots skewt from uwyo sounding data (file or online)
+* :py:func:`load_sounding_data`, :py:func:`load_sounding_data_csv` -- load sounding data files
+* :py:func:`load_sounding_directory` -- load a directory of sounding data files
 
 These functions are called by command line scripts provided to make plotting from data files easy. 
 You can invoke these through command line scripts as:
@@ -59,6 +61,7 @@ You can invoke these through command line scripts as:
    $ skewt uwyoweb --station 72251 skewt.pdf
 
 * :py:func:`plot` -- generic high level plot function
+* :py:func:`plot_pages` / :py:class:`SoundingPages` -- many soundings into one multi-page PDF
 
 .. code-block:: python
 
@@ -101,6 +104,11 @@ These variables affect the plotting style of skewt data
 * :py:data:`linecolor_Parcel_T`, :py:data:`linewidth_Parcel_T`
 * :py:data:`linecolor_Tvp`, :py:data:`linewidth_Tvp`, :py:data:`linestyle_Tvp`
 
+These variables select the output resolution and level of detail
+(print, web or thumbnail)
+
+* :py:data:`render_profile`, :py:data:`render_profiles`
+
 
 Functions to draw isolines
 --------------------------
@@ -125,8 +133,10 @@ import pymeteo.dynamics as dyn
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.lines import Line2D
+from matplotlib.backends.backend_pdf import PdfPages
 import h5py
 import pymeteo.cm1.read_grads as cm1
+import pymeteo.cm1.read_hdf5 as read_hdf5
 import pymeteo.interp
 import pymeteo.constants as metconst
 from netCDF4 import Dataset
@@ -230,6 +240,20 @@ plevs_plot = np.arange(pb_plot,pt_plot-1,-dp_plot)
 plevs_plot2 = np.arange(pb_plot,pt_plot2-1,-dp_plot)
 plevs_std = [100000,85000,70000,50000,40000,30000,25000,20000,15000]
 
+## Render profiles
+render_profiles = {
+  'print'     : {'dpi': 300, 'figsize': (10, 8), 'decimate': 1, 'barbs': None, 'datablock': True,  'legend': True},
+  'web'       : {'dpi': 100, 'figsize': (10, 8), 'decimate': 2, 'barbs': 50,   'datablock': False, 'legend': True},
+  'thumbnail' : {'dpi': 60,  'figsize': (5, 4),  'decimate': 3, 'barbs': 25,   'datablock': False, 'legend': False},
+}
+"""Output settings by use.  Each profile sets the resolution (dpi),
+figure size (inches), decimation of the background line families
+(draw every n-th isotherm, adiabat and mixing ratio line), the most
+wind barbs to draw (None for one per level) and whether the datablock
+and legend are drawn."""
+render_profile = 'print'
+"""The :py:data:`render_profiles` entry used when plotting"""
+
 #TODO: enforce square w/ aspect ratio of plot
 #Domain of the hodograph
 umin = -22.5
@@ -260,8 +284,8 @@ def plot_cm1h5(filename, xi, yi, output):
     - *th* -- potential temperature (K)
     - *thpert* -- potential temperature perturbation (K)
     - *prs* -- pressure (Pa)
-    - *u* -- u wind speed (m/s)
-    - *v* -- v wind speed (m/s)
+    - *u* -- u wind speed (m/s), averaged to the scalar point
+    - *v* -- v wind speed (m/s), averaged to the scalar point
     - *qv* -- water vapor mixing ratio (kg/kg)
 
     The names of these variables correspond to default naming by 
@@ -269,19 +293,32 @@ def plot_cm1h5(filename, xi, yi, output):
 
     """
     f = h5py.File(filename, 'r')
+    x, y, z, t, th, p, qv, u, v = read_cm1h5_column(f, xi, yi)
+
+    print(x,y,z[0],t,th[0],u[0],v[0],p[0],qv[0])
+    plot_old(x,y,z,t,th,p,qv,u,v,filename, output)
+
+def read_cm1h5_column(f, xi, yi):
+    """Reads the sounding at a gridpoint of an open CM1 HDF5 file
+
+    :param f: open :py:class:`h5py.File`
+    :param xi: The X gridpoint of the sounding.
+    :param yi: The Y gridpoint of the sounding.
+    :returns: x, y, z, t, th, p, qv, u, v as used by :py:func:`plot_cm1h5`
+    """
     z = f["/mesh/zh"][:]    # m 
 
     x = f["/mesh/xh"][xi]   # m
     y = f["/mesh/yh"][yi]   # m
     t = f["/time"][0]       # s
-    th = f["/3d_s/thpert"][:,yi,xi] + f["/basestate/th0"][:] # K
-    p = f["/3d_s/ppert"][:,yi,xi] + f["/basestate/pres0"][:] # Pa
-    u = f["/3d_u/u"][:,yi,xi] # m/s
-    v = f["/3d_v/v"][:,yi,xi] # m/s
-    qv = f["/3d_s/qvpert"][:,yi,xi] + f["/basestate/qv0"][:] #kg/kg
+    column = read_hdf5.derive(f, ['th', 'prs', 'qv', 'uinterp', 'vinterp'], xi, xi+1, yi, yi+1, 0, len(z))
+    th = column['th'][:,0,0]  # K
+    p = column['prs'][:,0,0]  # Pa
+    u = column['uinterp'][:,0,0] # m/s
+    v = column['vinterp'][:,0,0] # m/s
+    qv = column['qv'][:,0,0]  #kg/kg
 
-    print(x,y,z[0],t,th[0],u[0],v[0],p[0],qv[0])
-    plot_old(x,y,z,t,th,p,qv,u,v,filename, output)
+    return x, y, z, t, th, p, qv, u, v
 
 ##################################################################################
 def plot_wrf(filename, lat, lon, time, output):
@@ -327,7 +364,21 @@ def plot_wrf(filename, lat, lon, time, output):
 
     # Open NetCDF file
     f = Dataset(filename, 'r')
+    x, z, th, p, qv, u, v, t = read_wrf_column(f, lat, lon, time)
+
+    title = os.path.basename(filename)
+    print(x, z[0],t,th[0],u[0],v[0],p[0],qv[0])
+    plot(x, z, th, p, qv, u, v, output, t, title)
+
+def read_wrf_column(f, lat, lon, time):
+    """Reads the sounding nearest a location from an open WRF NetCDF file
 
+    :param f: open WRF NetCDF dataset
+    :param lat: The latitude of the sounding.
+    :param lon: The longitude of the sounding.
+    :param time: The time index of the sounding.
+    :returns: location string, z, th, p, qv, u, v and time string
+    """
     wrf_lats = f.variables['XLAT'][time,:,:] # :,0
     wrf_lons = f.variables['XLONG'][time,:,:]# 0,:
     wrf_time = (f.variables['Times'][time]).tostring().decode('UTF-8')
@@ -345,14 +396,6 @@ def plot_wrf(filename, lat, lon, time, output):
 
     i,j = wrf.ll_to_ij(map_proj, truelat1, truelat2, stand_lon, dx, dy, ref_lat, ref_lon, lat, lon)
 
-    ref_lat_u = f.variables['XLAT_U'][time,0,0]
-    ref_lon_u = f.variables['XLONG_U'][time,0,0]
-    ref_lat_v = f.variables['XLAT_V'][time,0,0]
-    ref_lon_v = f.variables['XLONG_V'][time,0,0]
-
-    i_u,j_u = wrf.ll_to_ij(map_proj, truelat1, truelat2, stand_lon, dx, dy, ref_lat_u, ref_lon_u, lat, lon)
-    i_v,j_v = wrf.ll_to_ij(map_proj, truelat1, truelat2, stand_lon, dx, dy, ref_lat_v, ref_lon_v, lat, lon)
-
     # location
     N = 'N'
     if (lat < 0.):
@@ -368,13 +411,8 @@ def plot_wrf(filename, lat, lon, time, output):
     p = np.insert(p, 0, p_surface)
 
     # z heights
-    ph = f.variables['PH'][time,:,j,i]
-    phb = f.variables['PHB'][time,:,j,i]
-    z_surface = ph[0]
-    z = np.zeros(len(ph)-1, np.float32)
-    for k in range(len(z)):
-         z[k] = ((( ph[k]+ph[k+1] ) / 2.0) + ( phb[k] + phb[k+1]) / 2.0 ) / 9.81
-    z = np.insert(z, 0, z_surface)
+    z, z_surface = wrf.read_heights(f, time, i, i+1, j, j+1)
+    z = np.insert(z[:,0,0], 0, z_surface[0,0])
 
     # t
     t = wrf_time
@@ -384,28 +422,149 @@ def plot_wrf(filename, lat, lon, time, output):
     th = f.variables['T'][time,:,j,i] + 300.0
     th = np.insert(th, 0, th_surface)
 
-    # u
+    # u, v on the mass grid
+    u, v, _ = wrf.read_winds(f, time, i, i+1, j, j+1)
     u_surface = f.variables['U10'][time,j,i]
-    u = f.variables['U'][time,:,j_u,i_u]
-    u = np.insert(u, 0, u_surface)
-
-    # v
+    u = np.insert(u[:,0,0], 0, u_surface)
     v_surface = f.variables['V10'][time,j,i]
-    v = f.variables['V'][time,:,j_v,i_v]
-    v = np.insert(v, 0, v_surface)
+    v = np.insert(v[:,0,0], 0, v_surface)
 
     # qv
     qv_surface = f.variables['Q2'][time,j,i]
     qv = f.variables['QVAPOR'][time,:,j,i]
     qv = np.insert(qv, 0, qv_surface)
 
-    title = os.path.basename(filename)
-    print(x, z[0],t,th[0],u[0],v[0],p[0],qv[0])
-    plot(x, z, th, p, qv, u, v, output, t, title)
+    return x, z, th, p, qv, u, v, t
 
     
 ##################################################################################
 #
+def load_sounding_data(filename):
+    """Load a WRF / CM1 compatible sounding data file
+
+    :param filename: The name of the file to open.
+    :type filename: str
+    :returns: z (m), th (K), p (Pa), qv (kg/kg), u (m/s), v (m/s) with
+              the surface values as the first level
+
+    The datafile is the same format as used in sounding initalization
+    files for WRF and CM1. 
+
+    The format is:
+    1 line header with surface pressure (mb), theta (K) and qv (g/kg)
+    n number of lines with z (m), theta (K), qv (g/kg), u (m/s), v(m/s)
+
+    Pressure is integrated hydrostatically from the surface pressure
+    using potential temperature.
+    """
+    with open(filename, 'r') as f:
+        p0, th0, qv0 = f.readline().split()[:3]
+        data = np.array(f.read().split(), np.float64).reshape((-1, 5))
+
+    # one more z index for surface values
+    nk = data.shape[0] + 1
+    z, th, qv, u, v = np.empty((5, nk), np.float32)
+    z[1:], th[1:], qv[1:], u[1:], v[1:] = data.T
+    qv[1:] /= 1000.
+
+    # surface values, winds extrapolated from the lowest levels
+    z[0] = 0.
+    th[0] = float(th0)
+    qv[0] = float(qv0) / 1000.
+    u[0] = 1.75*u[1]-u[2]+0.25*u[3]
+    v[0] = 1.75*v[1]-v[2]+0.25*v[3]
+
+    p, pi = met.hydrostatic(z, th, float(p0) * 100.)
+    return z, th, p.astype(np.float32), qv, u, v
+
+def load_sounding_data_csv(filename, missing=-9999.):
+    """Load a CSV sounding data file
+
+    :param filename: The name of the file to open.
+    :type filename: str
+    :param missing: value marking missing data
+    :returns: z (m), th (K), p (Pa), qv (kg/kg), u (m/s), v (m/s)
+
+    The datafile format is CSV with the following columns: 
+
+    - pressure (mb)
+    - height (m)
+    - temperature (C)
+    - dew point (C)
+    - wind direction (degrees)
+    - wind speed (kt)
+
+    Missing values are linearly interpolated in height from the
+    nearest valid levels and held constant beyond the first and last
+    valid level.
+    """
+    p,z,T,Td,wdir,wspd = np.loadtxt(filename, delimiter=',', unpack=True, ndmin=2)
+    # Pressure to Pa
+    p = p * 100.
+
+    # wind components in m/s, missing winds interpolated
+    wind = (wdir != missing) & (wspd != missing)
+    u, v = dyn.wind_deg_to_uv(wdir, wspd * 0.5144444)
+    u = _fill_missing(z, u, wind)
+    v = _fill_missing(z, v, wind)
+    T = _fill_missing(z, T, T != missing) + met.T00
+    Td = _fill_missing(z, Td, Td != missing) + met.T00
+
+    th = met.theta(T, p)
+    qv = 0.622 * met.es(Td) / p
+
+    return (z.astype(np.float32), th.astype(np.float32), p.astype(np.float32),
+            qv.astype(np.float32), u.astype(np.float32), v.astype(np.float32))
+
+def _fill_missing(z, x, valid):
+    # linear interpolation in z over the invalid levels
+    if valid.all() or not valid.any():
+        return x
+    return np.where(valid, x, np.interp(z, z[valid], x[valid]))
+
+sounding_loaders = { 'sounding' : load_sounding_data,
+                     'csv'      : load_sounding_data_csv }
+"""Loaders for sounding data files, by format"""
+
+def load_sounding_directory(path, pattern='*', fmt='sounding', output=None):
+    """Load every sounding data file in a directory
+
+    :param path: directory containing the files
+    :param pattern: glob pattern of the files to load
+    :param fmt: file format, one of :py:data:`sounding_loaders`
+    :param output: if set, the soundings are written to this
+                   :py:mod:`pymeteo.archive` file instead of returned
+    :returns: list of (filename, (z, th, p, qv, u, v)), or the number of
+              soundings archived
+    
+    Files that cannot be read are reported and skipped.
+    """
+    import glob
+    loader = sounding_loaders[fmt]
+    filenames = sorted(f for f in glob.glob(os.path.join(path, pattern)) if os.path.isfile(f))
+
+    if output is not None:
+        import pymeteo.archive as archive
+        count = 0
+        with archive.Writer(output) as w:
+            for filename in filenames:
+                try:
+                    sounding = loader(filename)
+                except (ValueError, IndexError) as e:
+                    print('Skipping {0}: {1}'.format(filename, e))
+                    continue
+                w.append(*sounding, station=os.path.basename(filename))
+                count += 1
+        return count
+
+    soundings = []
+    for filename in filenames:
+        try:
+            soundings.append((filename, loader(filename)))
+        except (ValueError, IndexError) as e:
+            print('Skipping {0}: {1}'.format(filename, e))
+    return soundings
+
 def plot_sounding_data(filename, output):
         """Plot SkewT from a WRF / CM1 compatible sounding data file
     
@@ -414,55 +573,9 @@ def plot_sounding_data(filename, output):
         :param output: The name of the file to output plot
         :type output: str
 
-        The datafile is the same format as used in sounding initalization
-        files for WRF and CM1. 
-        
-        The format is:
-        1 line header with surface pressure (mb), theta (K) and qv (g/kg)
-        n number of lines with z (m), theta (K), qv (g/kg), u (m/s), v(m/s)
-
+        The datafile is read by :py:func:`load_sounding_data`.
         """
-        # load first line of file
-        with open(filename, 'r') as f:
-            surface = f.readline()
-
-        p0, th0, qv0 = surface.split()
-
-        # load rest of file
-        _z, _th, _qv, _u, _v = np.loadtxt(filename, unpack=True, skiprows=1)
-
-        # create arrays with one more z index for surface values
-        nk = len(_z) + 1
-        z = np.empty(nk, np.float32)
-        th= np.empty(nk, np.float32)
-        qv= np.empty(nk, np.float32)
-        u = np.empty(nk, np.float32)
-        v = np.empty(nk, np.float32)
-        p = np.empty(nk, np.float32)
-
-        # copy the arrays, leaving room at the surface
-        z[1:nk] = _z
-        th[1:nk] = _th
-        qv[1:nk] = _qv / 1000.
-        u[1:nk] = _u
-        v[1:nk] = _v
-
-        # assign surface values
-        z[0] = 0.
-        th[0] = float(th0)
-        qv[0] = float(qv0) / 1000.
-        u[0] = 1.75*u[1]-u[2]+0.25*u[3]
-        v[0] = 1.75*v[1]-v[2]+0.25*v[3]
-        p[0] = float(p0) * 100.
-
-        # integrate pressure, assume hydrostatic
-        # dp = -rho*g*dz
-        for k in np.arange(1,nk):
-            p[k] = p[k-1] * np.exp((metconst.g*(z[k-1]-z[k]))/(metconst.Rd*met.T((th[k]+th[k-1])/2.,p[k-1])))
-
-        #for k in np.arange(nk):
-        #    print(z[k], p[k], th[k], qv[k], u[k], v[k])
-            
+        z, th, p, qv, u, v = load_sounding_data(filename)
         plot(None, z, th, p, qv, u, v, output, title="input sounding")
 
 def plot_sounding_data_uwyo(filename, output, stationID=0, date=None):
@@ -507,88 +620,10 @@ def plot_sounding_data_csv(filename, output):
         :param output: The name of the file to output plot
         :type output: str
 
-        The datafile format is CSV with the following columns: 
-
-        - pressure (mb)
-        - height (m)
-        - temperature (C)
-        - dew point (C)
-        - wind direction (degrees)
-        - wind speed (m/s)
-        
+        The datafile is read by :py:func:`load_sounding_data_csv`.
         Missing values should be filled with the value -9999.00
         """
-        p,z,T,Td,wdir,wspd = np.loadtxt(filename, delimiter=',',  unpack=True)
-        # Pressure to Pa
-        p = p * 100.
-
-        # z to km
-        #z = z / 1000.
-        
-        # interpolate missing wind
-
-        nk = len(z)
-        u = np.empty(nk, np.float32)
-        v = np.empty(nk, np.float32)
-
-        for k in range(nk):
-           if wdir[k] == -9999. and wspd[k] == -9999.:
-              u[k] = v[k] = -9999.
-           else:
-              u[k], v[k] = dyn.wind_deg_to_uv(wdir[k], wspd[k])
-
-           #print('{0:5.2f} {1:5.2f} = {2:5.2f} {3:5.2f}'.format(wdir[k], wspd[k], u[k], v[k]))
-           
-        _z = np.empty(2,np.float32)
-        _u = np.empty(2,np.float32)
-        _v = np.empty(2,np.float32)
-        print('INTERPOLATING')
-        for k in range(nk):
-           if wdir[k] == -9999. and wspd[k] == -9999.:
-              kb = ke = k
-              while kb >= 0 and wdir[kb] == -9999. and wspd[kb] == -9999.:
-                 kb -= 1
-              while ke <= nk-1 and wdir[ke] == -9999. and wspd[ke] == -9999.:
-                 ke += 1
-
-              # everything in bounds
-              if kb >= 0 and ke <= nk-1:
-                 _z[0] = z[kb]
-                 _z[1] = z[ke]
-                 _u[0] = u[kb]
-                 _u[1] = u[ke]
-                 _v[0] = v[kb]
-                 _v[1] = v[ke]
-                 
-                 u[k] = pymeteo.interp.linear(_z, _u, z[k])
-                 v[k] = pymeteo.interp.linear(_z, _v, z[k])
-
-              elif kb < 0:
-                 u[k] = u[ke]
-                 v[k] = v[ke] 
-              elif ke > nk-1:
-                 u[k] = u[kb]
-                 v[k] = v[kb] 
-
-        for k in range(nk):
-           # kt to m/s
-           u[k] = u[k] * 0.5144444
-           v[k] = v[k] * 0.5144444
-        #   print('{0:5.2f} {1:5.2f} = {2:5.2f} {3:5.2f}'.format(wdir[k], wspd[k], u[k], v[k]))
-
-        # calc theta
-        th = np.empty(nk, np.float32)
-        # calc qv
-        qv = np.empty(nk, np.float32)
-        for k in range(nk):
-           th[k] = met.theta(T[k]+met.T00, p[k]) 
-           w = met.es(Td[k]+met.T00) / met.es(T[k]+met.T00)
-           pp = met.es(T[k]+met.T00) / p[k]
-           qv[k] = 0.622 * pp * w
-           #qv[k] = met.es(Td[k]+met.T00) / (met.Rv * (T[k]+met.T00))
-
-        #print(z, th, p, qv, u, v)
-
+        z, th, p, qv, u, v = load_sounding_data_csv(filename)
         plot(None, z, th, p, qv, u, v, output, title='Sounding Data')
 
         
@@ -663,7 +698,7 @@ def plot_cm1(path, filename, xi, yi,output):
 def plot_old(x, y, z, time, th, p, qv, u, v, title, output):
   plot("{0} km, {1} km".format(x,y), z, th, p, qv, u, v, output, time, title) 
 
-def plot(loc, z, th, p, qv, u, v, output, time = None, title = None):
+def plot(loc, z, th, p, qv, u, v, output, time = None, title = None, profile = None):
   """Plots Skew-T/Log-P diagrapms with hodograph
 
   The helper functions above facilitate loading data from
@@ -681,40 +716,225 @@ def plot(loc, z, th, p, qv, u, v, output, time = None, title = None):
   :parameter v: v winds at z points
   :parameter title: Title for plot
   :parameter output: Filename to save plot to
+  :parameter profile: Name of a :py:data:`render_profiles` entry, defaults
+                      to :py:data:`render_profile`
 
   """
-  fig = plt.figure(1, figsize=(10, 8), dpi=300, edgecolor='k')
-  
+  rp = render_profiles[profile or render_profile]
+  fig = plt.figure(1, figsize=rp['figsize'], dpi=rp['dpi'], edgecolor='k')
+  axes = plot_page_axes(fig, profile)
+  plot_page(axes, loc, z, th, p, qv, u, v, time, title, profile)
+  plt.savefig(output, dpi=rp['dpi'],bbox_inches=0)
+  plt.close()
+
+def plot_page_axes(fig, profile = None):
+  """Creates the axes of a full skew-t page and draws their backgrounds
+
+  :parameter fig: The figure to draw on
+  :parameter profile: Name of a :py:data:`render_profiles` entry
+  :returns: dict of the sounding, hodograph, datablock, wind and legend axes
+  """
+  rp = render_profiles[profile or render_profile]
   # sounding
   ax1 = plt.subplot(121)
-  plot_sounding_axes(ax1)
-  plot_sounding(ax1, z, th, p, qv, None, None)
+  plot_sounding_axes(ax1, rp['decimate'])
   # hodograph
   ax2 = plt.subplot(222)
   plot_hodo_axes(ax2)
-  plot_hodograph(ax2, z, u, v)
   # datablock
   ax3 = fig.add_subplot(224)
-  try:
-    plot_datablock(ax3, loc, z, time, th, p, qv, u, v, title)
-  except:
-      print("Error calcualting sounding stats, datablock omitted");
-    
   # wind barbs
   ax4 = fig.add_subplot(132)
   plot_wind_axes(ax4)
-  plot_wind_barbs(ax4,z,p,u,v)
   # legend
   ax5 = fig.add_subplot(4,4,15)
-  plot_legend(ax5)
+  if rp['legend']:
+    plot_legend(ax5)
+  else:
+    ax5.set_axis_off()
 
-  
   # Adjust plot margins.
   plt.subplots_adjust(left=0.03, bottom=0.03, right=0.97, top=0.97, wspace=0.12, hspace=0.12)
-  plt.savefig(output, dpi=300,bbox_inches=0)
-  plt.close()
 
-def plot_sounding_axes(axes):
+  return {'sounding': ax1, 'hodograph': ax2, 'datablock': ax3, 'wind': ax4, 'legend': ax5}
+
+def plot_page(axes, loc, z, th, p, qv, u, v, time = None, title = None, profile = None):
+  """Draws sounding data on axes created by :py:func:`plot_page_axes`"""
+  rp = render_profiles[profile or render_profile]
+  pcl = plot_sounding(axes['sounding'], z, th, p, qv, None, None)
+  plot_hodograph(axes['hodograph'], z, u, v)
+  plt.sca(axes['datablock'])
+  if rp['datablock']:
+    try:
+      plot_datablock(axes['datablock'], loc, z, time, th, p, qv, u, v, title, pcl)
+    except:
+        print("Error calcualting sounding stats, datablock omitted");
+  else:
+    axes['datablock'].set_axis_off()
+  plt.sca(axes['wind'])
+  plot_wind_barbs(axes['wind'],z,p,u,v, rp['barbs'])
+
+def background_artists(axes):
+  """Returns the set of artists currently on a list of axes
+
+  :param axes: the axes holding a finished background
+  :returns: the set to pass to :py:func:`remove_artists` as keep
+
+  Taken after the axes are drawn and before any sounding is plotted,
+  the set marks the background that is kept between soundings.
+  """
+  return set(a for ax in axes for a in ax.get_children())
+
+def remove_artists(axes, keep):
+  """Removes the artists not in keep from a list of axes
+
+  :param axes: axes to clear
+  :param keep: artists to leave, from :py:func:`background_artists`
+
+  The axes title is cleared as well, leaving the axes as they were when
+  keep was taken.
+  """
+  for ax in axes:
+    for a in ax.get_children():
+      if a not in keep:
+        a.remove()
+    if ax.get_title():
+      ax.set_title('')
+
+class SkewTPage(object):
+  """A skew-t page that is built once and reused for many soundings
+
+  :parameter profile: Name of a :py:data:`render_profiles` entry
+
+  The figure, its axes and backgrounds are drawn when the page is
+  created.  :py:meth:`render` draws one sounding, saves it and removes
+  the sounding artists so the page is ready for the next one.
+  """
+
+  def __init__(self, profile = None):
+    self.profile = profile
+    rp = render_profiles[profile or render_profile]
+    self.dpi = rp['dpi']
+    self.fig = plt.figure(figsize=rp['figsize'], dpi=rp['dpi'], edgecolor='k')
+    plt.figure(self.fig.number)
+    self.axes = plot_page_axes(self.fig, profile)
+    self.background = background_artists(self.axes.values())
+
+  def render(self, output, loc, z, th, p, qv, u, v, time = None, title = None, fmt = None):
+    """Plots one sounding to output (a filename or file object)
+
+    :parameter fmt: Output format (e.g. 'png'), needed for file objects
+    """
+    plt.figure(self.fig.number)
+    try:
+      plot_page(self.axes, loc, z, th, p, qv, u, v, time, title, self.profile)
+      self.fig.savefig(output, dpi=self.dpi, format=fmt, bbox_inches=0)
+    finally:
+      remove_artists(self.axes.values(), self.background)
+
+  def close(self):
+    plt.close(self.fig)
+
+class SoundingPages(object):
+  """Writes many soundings into one multi-page PDF
+
+  :parameter output: Filename of the PDF to write
+  :parameter per_page: Number of soundings tiled on each page
+  :parameter figsize: Page size (inches)
+  :parameter dpi: Resolution of rasterized content
+
+  One figure is built and its backgrounds are drawn once.  For each
+  sounding only the data artists are drawn, the page is streamed into
+  a :py:class:`matplotlib.backends.backend_pdf.PdfPages` and the data
+  artists are removed again.  With per_page=1 each page is the same
+  as :py:func:`plot`; with more, each tile holds a skew-t with wind
+  barbs and a small hodograph.
+
+  .. code-block:: python
+
+     with skewt.SoundingPages('soundings.pdf', per_page=4) as pages:
+         for z, th, p, qv, u, v in soundings:
+             pages.add(None, z, th, p, qv, u, v)
+  """
+
+  def __init__(self, output, per_page=1, figsize=(10, 8), dpi=300):
+    self.pdf = PdfPages(output)
+    self.per_page = per_page
+    self.dpi = dpi
+    self.fig = plt.figure(figsize=figsize, dpi=dpi, edgecolor='k')
+    plt.figure(self.fig.number)
+    if per_page == 1:
+      self.tiles = [plot_page_axes(self.fig)]
+    else:
+      self.tiles = self._tile_axes()
+    # everything drawn so far is background and stays on every page
+    self.background = background_artists(ax for tile in self.tiles for ax in tile.values())
+    self.count = 0
+
+  def _tile_axes(self):
+    ncols = int(math.ceil(math.sqrt(self.per_page)))
+    nrows = int(math.ceil(self.per_page / float(ncols)))
+    tiles = []
+    for n in range(self.per_page):
+      ax = self.fig.add_subplot(nrows, ncols, n+1)
+      plot_sounding_axes(ax)
+      # hodograph inset in the upper right of the tile
+      l, b, w, h = ax.get_position().bounds
+      axh = self.fig.add_axes([l+0.62*w, b+0.62*h, 0.36*w, 0.36*h])
+      plot_hodo_axes(axh)
+      tiles.append({'sounding': ax, 'hodograph': axh})
+    return tiles
+
+  def add(self, loc, z, th, p, qv, u, v, time = None, title = None):
+    """Adds one sounding, writing the page out when it is full"""
+    tile = self.tiles[self.count % self.per_page]
+    if self.per_page == 1:
+      plot_page(tile, loc, z, th, p, qv, u, v, time, title)
+    else:
+      plt.sca(tile['sounding'])
+      plot_sounding(tile['sounding'], z, th, p, qv, u, v)
+      plot_hodograph(tile['hodograph'], z, u, v)
+      if title is not None:
+        tile['sounding'].set_title(title, fontsize=6)
+    self.count += 1
+    if self.count % self.per_page == 0:
+      self._write_page(self.per_page)
+
+  def _write_page(self, nused):
+    for n, tile in enumerate(self.tiles):
+      for ax in tile.values():
+        ax.set_visible(n < nused)
+    self.pdf.savefig(self.fig, dpi=self.dpi)
+    for tile in self.tiles:
+      for ax in tile.values():
+        ax.set_visible(True)
+      remove_artists(tile.values(), self.background)
+
+  def close(self):
+    """Writes any partially filled page and closes the PDF"""
+    if self.count % self.per_page != 0:
+      self._write_page(self.count % self.per_page)
+    self.pdf.close()
+    plt.close(self.fig)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.close()
+
+def plot_pages(soundings, output, per_page=1):
+  """Plots many soundings into one multi-page PDF
+
+  :parameter soundings: iterable of (loc, z, th, p, qv, u, v, time, title) tuples
+  :parameter output: Filename of the PDF to write
+  :parameter per_page: Number of soundings tiled on each page
+  """
+  with SoundingPages(output, per_page) as pages:
+    for sounding in soundings:
+      pages.add(*sounding)
+
+def plot_sounding_axes(axes, decimate=1):
   """Plots Skew-T/Log-P axes
 
   This will plot isotherms, isobars, dry and moist adiabats, 
@@ -722,12 +942,13 @@ def plot_sounding_axes(axes):
   setup the y axes to be reversed.
 
   :paramter axes: The axes to draw on
+  :paramter decimate: Draw every decimate-th line of each background family
   """
-  draw_isotherms(axes)
+  draw_isotherms(axes, decimate)
   draw_isobars(axes)
-  draw_dry_adiabat(axes)
-  draw_moist_adiabat(axes)
-  draw_water_mix_ratio(axes)
+  draw_dry_adiabat(axes, decimate)
+  draw_moist_adiabat(axes, decimate)
+  draw_water_mix_ratio(axes, decimate)
   remove_tick_labels(axes)
   axes.axis([Tmin, Tmax, pbot, ptop])
   axes.set_ylim(axes.get_ylim()[::1])
@@ -782,12 +1003,33 @@ def plot_legend(axes):
   
   
 def plot_wind(axes, z, p, u, v, x=0):  
-  for i in np.arange(0,len(z),1):
-    if (p[i] > pt_plot):
-      plt.barbs(x,p[i],u[i],v[i], length=5, linewidth=.5)
+  plot_barbs(axes, x, p, u, v)
+
+def plot_barbs(axes, x, p, u, v, step=1, max_barbs=None):
+  """Plots a column of wind barbs with a single barbs call
+
+  Levels above pt_plot are masked out.
+
+  :parameter x: x position of the column
+  :parameter p: pressure of each level (1D array)
+  :parameter step: plot every step-th level
+  :parameter max_barbs: if set, increase step so at most this many barbs are drawn
+  """
+  p = np.asarray(p)[::step]
+  u = np.asarray(u)[::step]
+  v = np.asarray(v)[::step]
+  above = p <= pt_plot
+  if max_barbs:
+    stride = int(math.ceil(np.count_nonzero(~above) / float(max_barbs)))
+    if stride > 1:
+      skip = np.ones(len(p), dtype=bool)
+      skip[np.flatnonzero(~above)[::stride]] = False
+      above |= skip
+  axes.barbs(np.full(len(p), x), p, np.ma.masked_where(above, u), np.ma.masked_where(above, v),
+             length=5, linewidth=.5)
 
   
-def plot_sounding(axes, z, th, p, qv, u = None, v = None):
+def plot_sounding(axes, z, th, p, qv, u = None, v = None, profiles = None):
   """Plot sounding data
 
   This plots temperature, dewpoint and wind data on a Skew-T/Log-P plot.
@@ -800,19 +1042,18 @@ def plot_sounding(axes, z, th, p, qv, u = None, v = None):
   :parameter qv: water vapor mixing ratio at z heights (1D array)
   :parameter u: U component of wind at z heights (1D array)
   :parameter v: V component of wind at z heights (1D array)
+  :parameter profiles: result of :py:func:`calc_sounding_profiles`, computed
+                       if not given
   :paramter axes: The axes instance to draw on
+  :returns: the lifted surface parcel from :py:func:`pymeteo.thermo.CAPE`
   """
-  # calculate Temperature and dewpoint
-  T = met.T(th,p) - met.T00                          # T (C)
-  Td = met.Td(p, qv) - met.T00                       # Td (C)
-
-  # calculate wetbulb temperature
-  Twb = np.empty(len(z), np.float32)                  # Twb (C)
-  for zlvl in range(len(z)):
-    Twb[zlvl] = met.Twb(z, p, th, qv, z[zlvl])
+  if profiles is None:
+    profiles = calc_sounding_profiles(z, th, p, qv)
+  T = profiles['T']
+  Td = profiles['Td']
+  Twb = profiles['Twb']
+  pcl = profiles['pcl']
 
-  # Get surface parcel CAPE and temperature / height profiles
-  pcl = met.CAPE(z, p, T+met.T00, qv, 1)        # CAPE
   T_parcel = pcl['t_p'] - met.T00                      # parcel T (C)
   T_vparcel = pcl['tv_p'] - met.T00                     # parcel Tv (C)
   T_venv = met.T(pcl['thv_env'], pcl['pp']) - met.T00  # Env Tv (C)
@@ -849,14 +1090,38 @@ def plot_sounding(axes, z, th, p, qv, u = None, v = None):
   # plot wind barbs on left side of plot.  move this?  right side?
   if (u is not None and v is not None):
       #draw_wind_line(axes)
-      for i in np.arange(0,len(z),2):
-          if (p[i] > pt_plot):
-              plt.barbs(Tmin+4,p[i],u[i],v[i], length=5, linewidth=.5)
+      plot_barbs(axes, Tmin+4, p, u, v, 2)
 
-def plot_wind_barbs(axes, z, p, u, v):
-    for i in np.arange(0,len(z)):
-        if (p[i] > pt_plot):
-            plt.barbs(0,p[i],u[i],v[i], length=5, linewidth=.5)
+  return pcl
+
+def calc_sounding_profiles(z, th, p, qv):
+  """Calculates the profiles drawn by :py:func:`plot_sounding`
+
+  This does not use matplotlib, so it can run away from the thread
+  that draws the plot.
+
+  :parameter z: height values (1D array)
+  :parameter th: potential temperature at z heights (1D array)
+  :parameter p: pressure at z heights (1D array)
+  :parameter qv: water vapor mixing ratio at z heights (1D array)
+  :returns: dict with T, Td and Twb (C) and the lifted surface parcel pcl
+  """
+  # calculate Temperature and dewpoint
+  T = met.T(th,p) - met.T00                          # T (C)
+  Td = met.Td(p, qv) - met.T00                       # Td (C)
+
+  # calculate wetbulb temperature
+  Twb = np.empty(len(z), np.float32)                  # Twb (C)
+  for zlvl in range(len(z)):
+    Twb[zlvl] = met.Twb(z, p, th, qv, z[zlvl])
+
+  # Get surface parcel CAPE and temperature / height profiles
+  pcl = met.CAPE(z, p, T+met.T00, qv, 1)        # CAPE
+
+  return {'T': T, 'Td': Td, 'Twb': Twb, 'pcl': pcl}
+
+def plot_wind_barbs(axes, z, p, u, v, max_barbs=None):
+    plot_barbs(axes, 0, p, u, v, max_barbs=max_barbs)
 
               
 def plot_hodograph(axes, z, u, v):
@@ -871,29 +1136,27 @@ def plot_hodograph(axes, z, u, v):
   """
   
   # plot hodograph
-  z6km = 0
-  while z[z6km] <= 12000:
-    z6km += 1
-  axes.plot(u[0:z6km],v[0:z6km], color='black', linewidth=1.5)
-
-  for zlvl in np.arange(0,7000,1000):
-    ulvl = pymeteo.interp.linear(z,u,zlvl)
-    vlvl = pymeteo.interp.linear(z,v,zlvl)
-    #print('calculating winds at height {0} = ({1},{2})'.format(zlvl,ulvl,vlvl))
+  z12km = np.searchsorted(z, 12000, side='right')
+  axes.plot(u[0:z12km],v[0:z12km], color='black', linewidth=1.5)
+
+  # label 0-6 km
+  zlvls = np.arange(0,7000,1000)
+  ulvls = np.interp(zlvls, z, u)
+  vlvls = np.interp(zlvls, z, v)
+  for zlvl, ulvl, vlvl in zip(zlvls, ulvls, vlvls):
     label_h2(ulvl+1,vlvl-1,str(zlvl/1000), 'black', 0, axes)
-    axes.plot(ulvl,vlvl, color='black', markersize=5, marker='.')
+  axes.plot(ulvls,vlvls, color='black', markersize=5, marker='.', linestyle='none')
 
-  #TODO: fix this
-    try:
-      ucb = dyn.storm_motion_bunkers(u,v,z)
-      axes.plot(ucb[0],ucb[1],markersize=4,color='black',marker='x')
-      axes.plot(ucb[2],ucb[3],markersize=4,color='black',marker='x')
-    except:
-        print("Error calculating sounding stats, storm motion marker not plotted");
+  try:
+    ucb = dyn.storm_motion_bunkers(u,v,z)
+    axes.plot([ucb[0],ucb[2]],[ucb[1],ucb[3]],markersize=4,color='black',marker='x',linestyle='none')
+  except:
+      print("Error calculating sounding stats, storm motion marker not plotted");
       
-def calc_sounding_stats(_z, _th, _p, _qv):
+def calc_sounding_stats(_z, _th, _p, _qv, pcl=None):
   T = met.T(_th,_p)                        # T (K)
-  pcl = met.CAPE(_z, _p, T, _qv, 1)        # CAPE
+  if pcl is None:
+    pcl = met.CAPE(_z, _p, T, _qv, 1)      # CAPE
   mupcl = met.CAPE(_z, _p, T, _qv, 2)      # MUCAPE
   mlpcl = met.CAPE(_z, _p, T, _qv, 3)      # MLCAPE
 
@@ -944,8 +1207,13 @@ def calc_hodograph_stats(_z, _u, _v):
   return dict
 
 
-def plot_datablock(ax4, _x,_z,_t,_th,_p,_qv,_u,_v, _title):
-  pcl, mupcl, mlpcl = calc_sounding_stats(_z, _th, _p, _qv)
+def plot_datablock(ax4, _x,_z,_t,_th,_p,_qv,_u,_v, _title, pcl=None):
+  """Draws the sounding statistics block
+
+  :parameter pcl: surface parcel from :py:func:`plot_sounding`, lifted
+                  again if not given
+  """
+  pcl, mupcl, mlpcl = calc_sounding_stats(_z, _th, _p, _qv, pcl)
   shear = calc_hodograph_stats(_z, _u, _v)
 
   brn = dyn.brn(_u, _v, _z, pcl['cape'])
@@ -972,79 +1240,60 @@ def plot_datablock(ax4, _x,_z,_t,_th,_p,_qv,_u,_v, _title):
 
 	# LCL, CCL, EL, convective temp?
 	# other data?
-	
+
   x = 0.4
   y = 0
-  line = 'Hodograph'
-  plt.text(x,y, line, verticalalignment='center', horizontalalignment='left', fontsize=5)
-  x += 0.02
-  y -= 0.065
-  line = '0-1 km shear {0:3d}$^\circ$ {1:3.1f} m/s'.format(int(shear['s01'][0]),shear['s01'][1])
-  plt.text(x,y, line, verticalalignment='center', horizontalalignment='left', fontsize=5)
-  y -= 0.05
-  line = '0-3 km shear {0:3d}$^\circ$ {1:3.1f} m/s'.format(int(shear['s03'][0]),shear['s03'][1])
-  plt.text(x,y, line, verticalalignment='center', horizontalalignment='left', fontsize=5)
-  y -= 0.05
-  line = '0-6 km shear {0:3d}$^\circ$ {1:3.1f} m/s'.format(int(shear['s06'][0]),shear['s06'][1])
-  plt.text(x,y, line, verticalalignment='center', horizontalalignment='left', fontsize=5)
-  y -= 0.05
-  line = 'SRH 0-1 : {0:d} m2/s2'.format(int(shear['srh01']))
-  plt.text(x,y, line, verticalalignment='center', horizontalalignment='left', fontsize=5)
-  y -= 0.05
-  line = 'SRH 0-3 : {0:d} m2/s2'.format(int(shear['srh03']))
-  plt.text(x,y, line, verticalalignment='center', horizontalalignment='left', fontsize=5)
-  y -= 0.05
-  line = 'ERH 0-1 : {0:d} m2/s2'.format(int(shear['erh01']))
-  plt.text(x,y, line, verticalalignment='center', horizontalalignment='left', fontsize=5)
-  y -= 0.05
-  line = 'ERH 0-3 : {0:d} m2/s2'.format(int(shear['erh03']))
-  plt.text(x,y, line, verticalalignment='center', horizontalalignment='left', fontsize=5)
-  y -= 0.05
-  line = 'BRN : {0:d}'.format(int(brn))
-  plt.text(x,y, line, verticalalignment='center', horizontalalignment='left', fontsize=5)
-  y -= 0.05
-  line = '0-1 km shear {0:3d}$^\circ$ {1:3.1f} m/s'.format(int(shear['s01'][0]),shear['s01'][1])
-  plt.text(x,y, line, verticalalignment='center', horizontalalignment='left', fontsize=5)
-  y -= 0.05
-  line = '1-2 km shear {0:3d}$^\circ$ {1:3.1f} m/s'.format(int(shear['s12'][0]),shear['s12'][1])
-  plt.text(x,y, line, verticalalignment='center', horizontalalignment='left', fontsize=5)
-  y -= 0.05
-  line = '2-3 km shear {0:3d}$^\circ$ {1:3.1f} m/s'.format(int(shear['s23'][0]),shear['s23'][1])
-  plt.text(x,y, line, verticalalignment='center', horizontalalignment='left', fontsize=5)
-  y -= 0.05
-  line = '3-4 km shear {0:3d}$^\circ$ {1:3.1f} m/s'.format(int(shear['s34'][0]),shear['s34'][1])
-  plt.text(x,y, line, verticalalignment='center', horizontalalignment='left', fontsize=5)
-  y -= 0.05
-  line = '4-5 km shear {0:3d}$^\circ$ {1:3.1f} m/s'.format(int(shear['s45'][0]),shear['s45'][1])
-  plt.text(x,y, line, verticalalignment='center', horizontalalignment='left', fontsize=5)
-  y -= 0.05
-  line = '5-6 km shear {0:3d}$^\circ$ {1:3.1f} m/s'.format(int(shear['s56'][0]),shear['s56'][1])
-  plt.text(x,y, line, verticalalignment='center', horizontalalignment='left', fontsize=5)
-
-def print_3col(name, value, unit, x, y):
-   plt.text(x,y, name, verticalalignment='center', horizontalalignment='left', fontsize=5)
-   plt.text(x+.35,y, value, verticalalignment='center', horizontalalignment='right', fontsize=5)
-   plt.text(x+.4,y, unit, verticalalignment='center', horizontalalignment='left', fontsize=5)
+  plt.text(x,y, 'Hodograph', verticalalignment='center', horizontalalignment='left', fontsize=5)
+  lines = ['0-1 km shear {0:3d}$^\circ$ {1:3.1f} m/s'.format(int(shear['s01'][0]),shear['s01'][1]),
+           '0-3 km shear {0:3d}$^\circ$ {1:3.1f} m/s'.format(int(shear['s03'][0]),shear['s03'][1]),
+           '0-6 km shear {0:3d}$^\circ$ {1:3.1f} m/s'.format(int(shear['s06'][0]),shear['s06'][1]),
+           'SRH 0-1 : {0:d} m2/s2'.format(int(shear['srh01'])),
+           'SRH 0-3 : {0:d} m2/s2'.format(int(shear['srh03'])),
+           'ERH 0-1 : {0:d} m2/s2'.format(int(shear['erh01'])),
+           'ERH 0-3 : {0:d} m2/s2'.format(int(shear['erh03'])),
+           'BRN : {0:d}'.format(int(brn)),
+           '0-1 km shear {0:3d}$^\circ$ {1:3.1f} m/s'.format(int(shear['s01'][0]),shear['s01'][1]),
+           '1-2 km shear {0:3d}$^\circ$ {1:3.1f} m/s'.format(int(shear['s12'][0]),shear['s12'][1]),
+           '2-3 km shear {0:3d}$^\circ$ {1:3.1f} m/s'.format(int(shear['s23'][0]),shear['s23'][1]),
+           '3-4 km shear {0:3d}$^\circ$ {1:3.1f} m/s'.format(int(shear['s34'][0]),shear['s34'][1]),
+           '4-5 km shear {0:3d}$^\circ$ {1:3.1f} m/s'.format(int(shear['s45'][0]),shear['s45'][1]),
+           '5-6 km shear {0:3d}$^\circ$ {1:3.1f} m/s'.format(int(shear['s56'][0]),shear['s56'][1])]
+  print_lines(lines, x+0.02, y-0.065, 'left')
+
+def print_lines(lines, x, y, align, dy=0.05, fontsize=5):
+  """Draws a column of lines as one text artist
+
+  The first line is centered on y and lines are dy apart in data
+  units of the current (datablock) axes.
+  """
+  ax = plt.gca()
+  # convert the line pitch from data units to a multiple of the font size
+  y0, y1 = ax.get_ylim()
+  height = ax.get_position().height * ax.figure.get_figheight() * 72.
+  spacing = dy * height / abs(y1 - y0) / fontsize
+  plt.text(x, y + 0.5*dy, '\n'.join(lines), verticalalignment='top', horizontalalignment=align,
+           multialignment=align, linespacing=spacing, fontsize=fontsize)
+
+def print_3col(names, values, units, x, y):
+  print_lines(names, x, y, 'left')
+  print_lines(values, x+.35, y, 'right')
+  print_lines(units, x+.4, y, 'left')
 
 def print_parcel_info(title, pcl, x, y):
   plt.text(x,y, title, verticalalignment='center', horizontalalignment='left', fontsize=5)
   y -= 0.065
   x += 0.02
-  print_3col('CAPE', '{0}'.format(int(pcl['cape'])), 'J kg$^{-1}$', x, y)
-  y -= 0.05
-  print_3col('CIN', '{0}'.format(int(pcl['cin'])), 'J kg$^{-1}$', x, y)
-  y -= 0.05
-  print_3col('TOPS', '{0:4.2f}'.format(float(pcl['ztops'])), 'km', x, y)
-  y -= 0.05
-  print_3col(r'$\theta_e$', '{0:4.1f}'.format(float(pcl['theta_e'])), 'K', x, y)
-  y -= 0.05
-  print_3col('LI$_{MAX}$', '{0:3.1f}'.format(float(pcl['max_li'])), 'C', x, y)
-  y -= 0.05
-  print_3col('LI$_{500}$', '{0:3.1f}'.format(float(pcl['li500'])), 'C', x, y)
-  y -= 0.05
-  print_3col('LI$_{300}$', '{0:3.1f}'.format(float(pcl['li300'])), 'C', x, y)
-  y -= 0.05
-  print_3col('Parcel', '{0}'.format(int(pcl['prs']/100.)), 'mb', x, y)
+  print_3col(['CAPE', 'CIN', 'TOPS', r'$\theta_e$', 'LI$_{MAX}$', 'LI$_{500}$', 'LI$_{300}$', 'Parcel'],
+             ['{0}'.format(int(pcl['cape'])),
+              '{0}'.format(int(pcl['cin'])),
+              '{0:4.2f}'.format(float(pcl['ztops'])),
+              '{0:4.1f}'.format(float(pcl['theta_e'])),
+              '{0:3.1f}'.format(float(pcl['max_li'])),
+              '{0:3.1f}'.format(float(pcl['li500'])),
+              '{0:3.1f}'.format(float(pcl['li300'])),
+              '{0}'.format(int(pcl['prs']/100.))],
+             ['J kg$^{-1}$', 'J kg$^{-1}$', 'km', 'K', 'C', 'C', 'C', 'mb'],
+             x, y)
 
 
 def remove_tick_labels(axes):
@@ -1119,15 +1368,16 @@ def skew(p):
     return skew_angle * np.log(met.p00/p)
 
 # Draw isotherms on skew-T / log p axes
-def draw_isotherms(axes):
+def draw_isotherms(axes, decimate=1):
     """Plot isotherms on axes
 
     :parameter axes: The axes to draw on
     :type axes: :py:class:`matplotlib.axes`
+    :parameter decimate: Draw every decimate-th isotherm
 
     This function draws isotherms every 10 C.
     """
-    for T in isotherms:
+    for T in isotherms[::decimate]:
         if (T % 10 == 0):
            axes.semilogy(T + skew(plevs_plot), plevs_plot, basey=math.e, color = lc_major, linewidth= lw_major)
         else:
@@ -1153,17 +1403,18 @@ def draw_isobars(axes):
     for i in np.arange(1000,100,-50):
         label(-10-((1000-i)*.025),i,str(i),'black',0, axes)
 
-def draw_dry_adiabat(axes):
+def draw_dry_adiabat(axes, decimate=1):
     """Plot dry adiabats on axes
 
     :parameter axes: The axes to draw on
     :type axes: :py:class:`matplotlib.axes`
+    :parameter decimate: Draw every decimate-th dry adiabat
 
     This function calculates dry adiabats
     and plots these lines.  Adiabats are calculated 
     every 10 K
     """
-    for T in dry_adiabats:
+    for T in dry_adiabats[::decimate]:
         dry_adiabat = met.T(T+met.T00,plevs_plot) - met.T00 + skew(plevs_plot)
         if (T % 10 == 0):
             axes.semilogy(dry_adiabat, plevs_plot, basey=math.e, color = lc_major, linewidth = lw_major)
@@ -1180,11 +1431,12 @@ def draw_dry_adiabat(axes):
         label(x,p/100,str(T),'black',theta, axes)
 
 
-def draw_moist_adiabat(axes):
+def draw_moist_adiabat(axes, decimate=1):
     """Plot moist adiabats on axes
 
     :parameter axes: The axes to draw on
     :type axes: :py:class:`matplotlib.axes`
+    :parameter decimate: Draw every decimate-th moist adiabat
 
     This function calculates moist adiabats
     and plots these lines.  Adiabats are calculated for
@@ -1194,7 +1446,7 @@ def draw_moist_adiabat(axes):
     ps_blo = [p for p in plevs_plot if p > 100000]
     ps_blo.reverse()
     ps = [p for p in plevs_plot2 if p < 100000]
-    for T in moist_adiabats:
+    for T in moist_adiabats[::decimate]:
         T_1000 = T = T + met.T00
         moist_adiabat = []
         # work backwards from 1000mb
@@ -1220,11 +1472,12 @@ def draw_moist_adiabat(axes):
             axes.semilogy(moist_adiabat, plevs_plot2, basey=math.e, color = lc_minor, linewidth = lw_minor)
 
 
-def draw_water_mix_ratio(axes):
+def draw_water_mix_ratio(axes, decimate=1):
     """Plot lines of constant water vapor mixing ratio on axes
 
     :parameter axes: The axes to draw on
     :type axes: :py:class:`matplotlib.axes`
+    :parameter decimate: Draw every decimate-th mixing ratio line
 
     This function calculates isolines of constant water vapor
     mixing ratio and plots these lines.  Values of w calculated
@@ -1232,7 +1485,7 @@ def draw_water_mix_ratio(axes):
     """
     #TODO: put w and the top plevel for plotting somewhere configurable
     ps = [p for p in plevs if p>=20000 and p<=105000]
-    for W in mixing_ratios:
+    for W in mixing_ratios[::decimate]:
         water_mix = []
         for p in ps:
             T = TMR(W,p/100.) 
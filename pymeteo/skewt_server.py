@@ -0,0 +1,199 @@
+"""
+.. module:: pymeteo.skewt_server
+   :platform: Unix
+   :synopsis: Long-running local Skew-T rendering service
+
+This module serves Skew-T/Log-P plots over HTTP on localhost.  Each
+worker process imports matplotlib once, keeps a warm
+:py:class:`pymeteo.skewt.SkewTPage` per render profile and keeps the
+most recently read datasets open, so a request only pays for reading a
+column and drawing the sounding.
+
+Starting the service
+++++++++++++++++++++
+
+.. code-block:: bash
+
+   $ skewt-server --port 8642 --workers 8
+
+Requesting plots
+++++++++++++++++
+
+Plots are requested with GET parameters and returned as image bytes:
+
+.. code-block:: bash
+
+   $ curl 'http://localhost:8642/render?source=cm1hdf5&file=/data/cm1out.00060.h5&x=100&y=120' > skewt.png
+   $ curl 'http://localhost:8642/render?source=wrf&file=wrfout.nc&lat=30.5&lon=-80&time=0&format=pdf' > skewt.pdf
+   $ curl 'http://localhost:8642/render?source=sounding&file=/data/input_sounding' > skewt.png
+
+Parameters are:
+
+* *source* -- one of :py:data:`sources`
+* *file* -- dataset filename (must be readable by the server)
+* *x*, *y* -- gridpoint for cm1hdf5
+* *lat*, *lon*, *time* -- location and time index for wrf
+* *sounding* and *csv* sources read whole files with
+  :py:func:`pymeteo.skewt.load_sounding_data` and
+  :py:func:`pymeteo.skewt.load_sounding_data_csv`
+* *format* -- output format, png (default), pdf or svg
+* *profile* -- render profile, defaults to the server profile
+
+Bad or missing parameters are answered with 400, unreadable or missing
+files with 404 and any other rendering failure with 500.
+
+Module Reference
+++++++++++++++++
+"""
+
+import io
+import os
+import multiprocessing
+from collections import OrderedDict
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+content_types = { 'png' : 'image/png',
+                  'pdf' : 'application/pdf',
+                  'svg' : 'image/svg+xml' }
+"""Output formats served and their content types"""
+
+max_datasets = 32
+"""Number of open datasets kept by each worker"""
+
+# per worker process state
+_pages = {}
+_datasets = OrderedDict()
+
+#-------------------------------------------------------
+# Worker side
+
+def _init_worker(profile):
+    # imports matplotlib and draws the background once per worker
+    import matplotlib
+    matplotlib.use('agg')
+    from pymeteo import skewt
+    skewt.render_profile = profile
+    _pages[profile] = skewt.SkewTPage(profile)
+
+def _dataset(source, filename):
+    # least recently used cache of open files, keyed by modification time
+    # so a rewritten file is reopened
+    key = (source, filename, os.stat(filename).st_mtime)
+    if key in _datasets:
+        _datasets.move_to_end(key)
+        return _datasets[key]
+    for stale in [k for k in _datasets if k[:2] == key[:2]]:
+        _datasets.pop(stale).close()
+    if source == 'cm1hdf5':
+        import h5py
+        _datasets[key] = h5py.File(filename, 'r')
+    elif source == 'wrf':
+        from netCDF4 import Dataset
+        _datasets[key] = Dataset(filename, 'r')
+    while len(_datasets) > max_datasets:
+        _datasets.popitem(last=False)[1].close()
+    return _datasets[key]
+
+def _read_cm1hdf5(params):
+    from pymeteo import skewt
+    f = _dataset('cm1hdf5', params['file'])
+    x, y, z, t, th, p, qv, u, v = skewt.read_cm1h5_column(f, int(params['x']), int(params['y']))
+    return "{0} km, {1} km".format(x, y), z, th, p, qv, u, v, t, os.path.basename(params['file'])
+
+def _read_wrf(params):
+    from pymeteo import skewt
+    f = _dataset('wrf', params['file'])
+    loc, z, th, p, qv, u, v, t = skewt.read_wrf_column(f, float(params['lat']), float(params['lon']),
+                                                       int(params.get('time', 0)))
+    return loc, z, th, p, qv, u, v, t, os.path.basename(params['file'])
+
+def _read_tabular(fmt):
+    def read(params):
+        from pymeteo import skewt
+        z, th, p, qv, u, v = skewt.sounding_loaders[fmt](params['file'])
+        return None, z, th, p, qv, u, v, None, os.path.basename(params['file'])
+    return read
+
+sources = { 'cm1hdf5'  : _read_cm1hdf5,
+            'wrf'      : _read_wrf,
+            'sounding' : _read_tabular('sounding'),
+            'csv'      : _read_tabular('csv') }
+"""Readers for each source type.  Each takes the request parameters
+and returns (loc, z, th, p, qv, u, v, time, title)."""
+
+def render(params):
+    """Renders one request in a worker process
+
+    :param params: dict of request parameters
+    :returns: image bytes
+    """
+    from pymeteo import skewt
+    fmt = params.get('format', 'png')
+    if fmt not in content_types:
+        raise ValueError('Unsupported format: {0}'.format(fmt))
+    if params.get('source') not in sources:
+        raise ValueError('Unsupported source: {0}'.format(params.get('source')))
+
+    profile = params.get('profile', skewt.render_profile)
+    if profile not in _pages:
+        _pages[profile] = skewt.SkewTPage(profile)
+
+    loc, z, th, p, qv, u, v, t, title = sources[params['source']](params)
+    buf = io.BytesIO()
+    _pages[profile].render(buf, loc, z, th, p, qv, u, v, t, title, fmt=fmt)
+    return buf.getvalue()
+
+#-------------------------------------------------------
+# Server side
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != '/render':
+            self.send_error(404)
+            return
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        try:
+            data = self.server.pool.apply(render, (params,))
+        except (ValueError, KeyError) as e:
+            self.send_error(400, str(e))
+            return
+        except OSError as e:
+            self.send_error(404, str(e))
+            return
+        except Exception as e:
+            self.send_error(500, str(e))
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_types[params.get('format', 'png')])
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            BaseHTTPRequestHandler.log_message(self, format, *args)
+
+def serve(port=8642, workers=None, profile='web', verbose=False):
+    """Runs the rendering service until interrupted
+
+    :param port: localhost port to listen on
+    :param workers: number of rendering processes, defaults to the number of cores
+    :param profile: default render profile
+    :param verbose: log each request
+    """
+    workers = workers or os.cpu_count()
+    pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=(profile,))
+    server = ThreadingHTTPServer(('127.0.0.1', port), _Handler)
+    server.pool = pool
+    server.verbose = verbose
+    print('Serving Skew-T plots on http://127.0.0.1:{0}/render with {1} workers'.format(port, workers))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        pool.terminate()
@@ -64,6 +64,218 @@ def th_e(p, t, td, qv):
 
    return th_e
 
+def th_e_array(p, t, td, qv, out=None):
+   """Equivalent potential temperature of arrays of points
+
+   This is the array version of :py:func:`th_e` and uses the same
+   formulation.
+
+   :parameter p: Pressure (Pa)
+   :parameter t: Temperature (K)
+   :parameter td: Dew-point temperature (K)
+   :parameter qv: Water vapor mixing ratio (kg/kg)
+   :parameter out: Optional array to hold the result
+   :returns: Equivalent potential temperature (K)
+   """
+   old_settings = np.seterr(all='ignore')
+
+   # temperature at the LCL
+   tlcl = np.log(t/td)
+   tlcl *= 0.00125
+   tlcl += 1./(td-56.)
+   np.divide(1., tlcl, out=tlcl)
+   tlcl += 56.
+   tlcl = np.where((td-t) >= -0.1, t, tlcl)
+
+   if out is None:
+      out = np.empty(tlcl.shape, np.result_type(t, np.float32))
+
+   # exp(((3376./tlcl)-2.54)*qv*(1.0+0.81*qv))
+   np.divide(3376., tlcl, out=tlcl)
+   tlcl -= 2.54
+   tlcl *= qv
+   np.multiply(qv, 0.81, out=out)
+   out += 1.
+   tlcl *= out
+   np.exp(tlcl, out=tlcl)
+
+   # t * (100000./p) ** (0.2854*(1.0-0.28*qv))
+   np.multiply(qv, -0.28, out=out)
+   out += 1.
+   out *= 0.2854
+   np.power(100000./p, out, out=out)
+   out *= t
+   out *= tlcl
+
+   np.seterr(**old_settings)
+   return out
+
+def most_unstable_parcel(p, t, qv, pmin=50000.):
+   """Finds the most unstable parcel of each column of a 3D field
+
+   The source level of each column is the level with the largest
+   equivalent potential temperature at pressures of at least pmin, as
+   used for the most unstable parcel in :py:func:`CAPE`.
+
+   :parameter p: Pressure (Pa), shape (nk, ...)
+   :parameter t: Temperature (K), shape (nk, ...)
+   :parameter qv: Water vapor mixing ratio (kg/kg), shape (nk, ...)
+   :parameter pmin: Lowest pressure (Pa) a source level may have
+   :returns: dict of source level properties, each shaped (...):
+             k (level index), p, t, th, qv, td and theta_e
+   """
+   p = np.asarray(p)
+   t = np.asarray(t)
+   qv = np.asarray(qv)
+
+   td = Td(p, qv)
+   the = th_e_array(p, t, td, qv)
+
+   # levels above pmin or without a valid theta-e never win; columns
+   # without any candidate fall back to the lowest level
+   candidates = np.ma.masked_where((p < pmin) | ~np.isfinite(the), the)
+   k = np.ma.argmax(candidates, axis=0, fill_value=-np.inf)
+
+   def source(var):
+      return np.take_along_axis(var, k[np.newaxis], axis=0)[0]
+
+   mu = { 'k'       : k,
+          'p'       : source(p),
+          't'       : source(t),
+          'qv'      : source(qv),
+          'td'      : source(td),
+          'theta_e' : source(the) }
+   mu['th'] = theta(mu['t'], mu['p'])
+   return mu
+
+def mixed_layer(z, p, variables, depths, units='m'):
+   """Averages variables over the lowest layer(s) of each column
+
+   Layer means are trapezoidal integrals divided by the layer depth.
+   The cumulative integral of every variable is computed once and each
+   depth is then read from it, so several depths cost about the same as
+   one.  Depths deeper than a column average the whole column.
+
+   :parameter z: Height (m), shape (nk,) or (nk, ...); unused for hPa
+   :parameter p: Pressure (Pa), shape (nk,) or (nk, ...); unused for m
+   :parameter variables: list of arrays to average, each (nk, ...)
+   :parameter depths: Layer depth or list of depths above the lowest level
+   :parameter units: 'm' for depths in metres or 'hPa' for pressure depths
+   :returns: list with the layer mean of each variable, shaped (...) for
+             a single depth or (len(depths), ...) for a list of depths
+
+   .. code-block:: python
+
+      # 50 and 100 hPa mixed layer theta and qv of a 3D volume
+      th_ml, qv_ml = thermo.mixed_layer(None, p, [th, qv], [50., 100.], 'hPa')
+   """
+   if units == 'm':
+      s = np.asarray(z, np.float64)
+      s = s - s[0]
+   elif units == 'hPa':
+      s = np.asarray(p, np.float64)
+      s = (s[0] - s) / 100.
+   else:
+      raise ValueError('Unsupported mixed layer units: {0}'.format(units))
+
+   var = np.stack([np.asarray(v, np.float64) for v in variables])
+   nk = var.shape[1]
+   s = np.broadcast_to(s.reshape(s.shape + (1,)*(var.ndim-1-s.ndim)), var.shape[1:])
+
+   # cumulative trapezoidal integral of every variable along the column
+   integral = np.zeros(var.shape)
+   np.cumsum(0.5 * np.diff(s, axis=0) * (var[:,1:] + var[:,:-1]), axis=1, out=integral[:,1:])
+
+   def at(a, k):
+      return np.take_along_axis(a, k[np.newaxis], axis=0)[0]
+
+   means = []
+   for depth in np.atleast_1d(depths):
+      top = np.minimum(float(depth), s[-1])
+      # layer below the top of the mixed layer
+      k = np.clip(np.count_nonzero(s <= top, axis=0) - 1, 0, nk-2)
+      s0 = at(s, k)
+      frac = (top - s0) / (at(s, k+1) - s0)
+      mean = np.empty((len(var),) + top.shape)
+      for n in range(len(var)):
+         v0 = at(var[n], k)
+         vtop = v0 + (at(var[n], k+1) - v0) * frac
+         mean[n] = (at(integral[n], k) + 0.5 * (top - s0) * (v0 + vtop)) / top
+      means.append(mean)
+
+   means = np.array(means)
+   if np.ndim(depths) == 0:
+      return list(means[0])
+   return list(np.swapaxes(means, 0, 1))
+
+def hydrostatic(z, thv, p0, z0=None, thv0=None):
+   """Integrates hydrostatic pressure upward from a surface pressure
+
+   The Exner function is integrated as :math:`d\\pi/dz = -g/(c_p \\theta_v)`
+   with the layer mean :math:`\\theta_v`, using a cumulative sum over
+   whole columns so 1D profiles and 3D fields cost the same per point.
+
+   :parameter z: Height (m), shape (nk,) or (nk, ...)
+   :parameter thv: Virtual potential temperature (K), shape (nk, ...)
+   :parameter p0: Pressure (Pa) at z0, scalar or shape (...)
+   :parameter z0: Height of p0 (m), defaults to the lowest level
+   :parameter thv0: Virtual potential temperature at z0 (K), defaults to
+                    the lowest level
+   :returns: pressure (Pa) and Exner function, each shaped like thv
+   """
+   thv = np.asarray(thv, np.float64)
+   z = np.asarray(z, np.float64)
+   z = z.reshape(z.shape + (1,)*(thv.ndim-z.ndim))
+   pi0 = (np.asarray(p0, np.float64)/p00)**kappa_d
+
+   pi = np.empty(np.broadcast(z, thv).shape)
+   if z0 is None:
+      pi[0] = pi0
+   else:
+      thv0 = thv[0] if thv0 is None else thv0
+      pi[0] = pi0 - gravity*(z[0]-z0)/(cp*0.5*(thv0+thv[0]))
+   pi[1:] = -gravity*np.diff(z, axis=0)/(cp*0.5*(thv[1:]+thv[:-1]))
+   np.cumsum(pi, axis=0, out=pi)
+   return p00*pi**(1./kappa_d), pi
+
+def hydrostatic_moist(z, th, p0, qv, z0=None, thv0=None, maxiter=20, tolerance=0.01):
+   """Integrates hydrostatic pressure for moisture that depends on pressure
+
+   Moisture and pressure are iterated to consistency: starting from a
+   dry column, :math:`\\theta_v` is computed from the current moisture,
+   pressure is integrated with :py:func:`hydrostatic` and the moisture
+   is recomputed, until pressure changes by less than the tolerance.
+
+   :parameter z: Height (m), shape (nk,) or (nk, ...)
+   :parameter th: Potential temperature (K), shape (nk, ...)
+   :parameter p0: Pressure (Pa) at z0
+   :parameter qv: function of pressure (Pa) and temperature (K) returning
+                  the water vapor mixing ratio (kg/kg)
+   :parameter z0: Height of p0 (m), defaults to the lowest level
+   :parameter thv0: Virtual potential temperature at z0 (K)
+   :parameter maxiter: Largest number of iterations
+   :parameter tolerance: Largest pressure change (Pa) of a converged column
+   :returns: pressure (Pa), Exner function and mixing ratio (kg/kg)
+
+   .. code-block:: python
+
+      # 80% relative humidity capped at 14 g/kg
+      p, pi, qv = thermo.hydrostatic_moist(z, th, 100000.,
+                     lambda p, t: np.minimum(0.8*thermo.q_vl(p, t), 0.014))
+   """
+   th = np.asarray(th, np.float64)
+   q = np.zeros(th.shape)
+   p = None
+   for n in range(maxiter):
+      thv = th*(1.+reps*q)/(1.+q)
+      p_new, pi = hydrostatic(z, thv, p0, z0, thv0)
+      q = qv(p_new, th*pi)
+      converged = p is not None and np.abs(p_new - p).max() < tolerance
+      p = p_new
+      if converged:
+         break
+   return p, pi, q
+
 def q_vl(p, t):
    _es = es(t)
    q_vl = epsilon*_es/(p-_es)
@@ -148,7 +360,7 @@ def CAPE(z, p, t, q, parcel):
    if (len(z) != len(p) != len(t) != len(q)):
       raise Exception('Bounds of z, T, Td do not match')
 
-   ml_depth = .500  # for option of mixed layer parcel.
+   ml_depth = 500.  # m, for option of mixed layer parcel.
    pinc = 100. # Pa
 
    adiabat = 1
@@ -178,74 +390,15 @@ def CAPE(z, p, t, q, parcel):
 
    elif (parcel == 2):
       # use most unstable parcel 
-
-      if (p[0] < 50000.):
-         kmax = 0
-         maxthe = th_e(p[0], t[0], td[0], q[0])
-      else:
-         maxthe = 0.
-         for k in range(nk):
-            if p[k] < 50000.:
-               break
-            the = th_e(p[k], t[k], td[k], q[k])
-            if (the > maxthe):
-               maxthe = the
-               kmax = k
+      mu = most_unstable_parcel(p, t, q)
+      kmax = int(mu['k'])
       if (debuglevel >= 100):
-         print('  kmax,maxthe = {0}, {1}'.format(kmax,maxthe))
+         print('  kmax,maxthe = {0}, {1}'.format(kmax,mu['theta_e']))
 
    elif (parcel == 3):
       # mixed layer
-
-      if ((z[1]-z[0]) > ml_depth):
-         # second level is above mixed layer
-         avgth = th[0]
-         avgqv = q[0]
-         kmax = 0
-
-      elif (z[nk-1] < ml_depth):
-         # all levels are in the mixed layer
-         #print nk-1, z[nk-1], ml_depth
-         avgth = th[nk-1]
-         avgqv = q[nk-1]
-         kmax = nk-1
-
-      else:
-         # calculate mixed layer properties
-
-         avgth = 0.
-         avgqv = 0.
-         k = 1
-         if (debuglevel >= 100):
-            print('  ml_depth = {0}'.format(ml_depth))
-            print('  k,z,th,q = {0}, {1}, {2}, {3}'.format(0, z[0], th[0], q[0]))
-
-         while ((z[k] <= ml_depth) and (k < nk)):
-            if (debuglevel >= 100):
-               print('  k,z,th,q = {0}, {1}, {2}, {3}'.format(k, z[k], th[k], q[k]))
-
-            avgth += 0.5 * (z[k] - z[k-1])*(th[k] + th[k-1])
-            avgqv += 0.5 * (z[k] - z[k-1])*(q[k] + q[k-1])
-            
-            k += 1
-
-         th2 = th[k-1]+(th[k]-th[k-1])*(ml_depth-z[k-1])/(z[k]-z[k-1])
-         qv2 = q[k-1]+(q[k]-q[k-1])*(ml_depth-z[k-1])/(z[k]-z[k-1])
-
-         if (debuglevel >= 100):
-               print('  k,z,th,q = {0}, {1}, {2}, {3}'.format(999, ml_depth, th2, qv2))
-            
-         avgth += 0.5*(ml_depth-z[k-1])*(th2+th[k-1])
-         avgqv += 0.5*(ml_depth-z[k-1])*(qv2+q[k-1])
-            
-
-         if (debuglevel >= 100):
-               print('  k,z,th,q = {0}, {1}, {2}, {3}'.format(k, z[k], th[k], q[k]))
-            
-         avgth /= ml_depth
-         avgqv /= ml_depth
-
-         kmax = 0
+      avgth, avgqv = [float(v) for v in mixed_layer(z, p, [th, q], ml_depth)]
+      kmax = 0
  
       if (debuglevel >= 100):
          print('  avgth, avgqv = {0}, {1}'.format(avgth, avgqv))
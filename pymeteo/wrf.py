@@ -1,5 +1,6 @@
 # wrf.py
 import numpy as np
+import pymeteo.interp
 
 ######
 # The following code is adapted from NCL which is copyright:
@@ -133,3 +134,75 @@ def ll_to_ij(map_proj, truelat1, truelat2, stand_lon, dx, dy, ref_lat, ref_lon,
     return (i,j)
 
 ########################################################
+
+def read_winds(f, time, ib, ie, jb, je):
+    """Reads U, V and W on the mass grid of a subdomain of a WRF file
+
+    :param f: open WRF NetCDF dataset
+    :param time: time index
+    :param ib,ie,jb,je: mass grid index bounds (west_east, south_north)
+    :returns: u, v, w (bottom_top, south_north, west_east) arrays
+
+    The staggered points bounding the subdomain are read once and
+    averaged to the mass points.  Use ib,ie=i,i+1 and jb,je=j,j+1
+    for a single column.
+    """
+    u = np.asarray(f.variables['U'][time,:,jb:je,ib:ie+1])
+    v = np.asarray(f.variables['V'][time,:,jb:je+1,ib:ie])
+    w = np.asarray(f.variables['W'][time,:,jb:je,ib:ie])
+    return (pymeteo.interp.destagger(u, 2),
+            pymeteo.interp.destagger(v, 1),
+            pymeteo.interp.destagger(w, 0))
+
+def read_heights(f, time, ib, ie, jb, je):
+    """Reads geopotential height on the mass grid of a subdomain of a WRF file
+
+    :param f: open WRF NetCDF dataset
+    :param time: time index
+    :param ib,ie,jb,je: mass grid index bounds (west_east, south_north)
+    :returns: heights (m) of the mass levels and of the surface
+    """
+    ph = np.asarray(f.variables['PH'][time,:,jb:je,ib:ie]) + np.asarray(f.variables['PHB'][time,:,jb:je,ib:ie])
+    return pymeteo.interp.destagger(ph, 0) / 9.81, ph[0] / 9.81
+
+def read_fields(f, time, varnames, ib, ie, jb, je):
+    """Reads WRF variables on the mass grid of a subdomain
+
+    :param f: open WRF NetCDF dataset
+    :param time: time index
+    :param varnames: list of mass grid variable names (e.g. 'QVAPOR'), 'U',
+                     'V' and 'W' (destaggered), 'Z' (height, m), 'PRES'
+                     (pressure, Pa) or 'TH' (potential temperature, K)
+    :param ib,ie,jb,je: mass grid index bounds (west_east, south_north)
+    :returns: dict of varname -> (bottom_top, south_north, west_east) array
+    """
+    data = {}
+    for name in varnames:
+        if name in ('U', 'V', 'W'):
+            if 'U' not in data:
+                data.update(zip(('U', 'V', 'W'), read_winds(f, time, ib, ie, jb, je)))
+        elif name == 'Z':
+            data[name] = read_heights(f, time, ib, ie, jb, je)[0]
+        elif name == 'PRES':
+            data[name] = (np.asarray(f.variables['P'][time,:,jb:je,ib:ie]) +
+                          np.asarray(f.variables['PB'][time,:,jb:je,ib:ie]))
+        elif name == 'TH':
+            data[name] = np.asarray(f.variables['T'][time,:,jb:je,ib:ie]) + 300.
+        else:
+            data[name] = np.asarray(f.variables[name][time,:,jb:je,ib:ie])
+    return dict((name, data[name]) for name in varnames)
+
+def read_isobaric(f, time, varnames, plevs):
+    """Reads WRF variables interpolated to isobaric levels
+
+    :param f: open WRF NetCDF dataset
+    :param time: time index
+    :param varnames: list of names accepted by :py:func:`read_fields`
+    :param plevs: list of pressure levels (Pa), e.g. [85000, 70000, 50000]
+    :returns: dict of varname -> (len(plevs), south_north, west_east) array
+    """
+    ny, nx = f.variables['P'].shape[2:]
+    data = read_fields(f, time, list(varnames) + ['PRES'], 0, nx, 0, ny)
+
+    isobaric = pymeteo.interp.interp_to_pressure(data['PRES'], plevs, [data[name] for name in varnames])
+    return dict(zip(varnames, isobaric))
@@ -52,6 +52,7 @@ setup(name='pymeteo',
                'bin/skewt',
                'bin/skewt-hdf',
                'bin/skewt-blank',
-               'bin/skewt-wrf'],
+               'bin/skewt-wrf',
+               'bin/skewt-server'],
       classifiers=filter(None, classifiers.split("\n")))
 